@@ -0,0 +1,105 @@
+"""
+Vectorized survey analytics over categorical columns
+
+Each answer column is dictionary-encoded once (codes in first-seen order, like the
+dict insertion order calculate_analytics produces); distributions, cross-tabs and
+per-village rollups are then computed with np.bincount over the integer codes.
+Only the final per-category counts are turned into Python percentages, using the
+same round(count / total * 100, 1) as calculate_analytics.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MISSING_ANSWER = "Unknown"
+
+
+def surveys_frame(surveys: Iterable[dict], fields: List[str]) -> pd.DataFrame:
+    """Load survey dicts into a frame with one categorical column per field"""
+    frame = pd.DataFrame.from_records(list(surveys), columns=fields)
+    return encode_frame(frame, fields)
+
+
+def encode_frame(frame: pd.DataFrame, fields: List[str]) -> pd.DataFrame:
+    """Dictionary-encode answer columns, categories ordered by first appearance"""
+    encoded = {}
+    for field in fields:
+        codes, categories = pd.factorize(frame[field].fillna(MISSING_ANSWER), sort=False)
+        encoded[field] = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.DataFrame(encoded, index=frame.index)
+
+
+def _percentages(categories, counts: np.ndarray, total: int) -> Dict[str, float]:
+    return {
+        category: round((int(count) / total) * 100, 1)
+        for category, count in zip(categories, counts)
+        if count
+    }
+
+
+def field_distributions(frame: pd.DataFrame, fields: List[str]) -> Dict[str, Dict[str, float]]:
+    """Per-field answer percentages, identical to calculate_analytics' community_stats"""
+    total = len(frame)
+    if not total:
+        return {}
+    distributions = {}
+    for field in fields:
+        column = frame[field].array
+        bins = np.bincount(column.codes, minlength=len(column.categories))
+        distributions[field] = _percentages(column.categories, bins, total)
+    return distributions
+
+
+def crosstab(frame: pd.DataFrame, row_field: str, column_field: str) -> Dict[str, Dict[str, int]]:
+    """Joint answer counts for two fields, e.g. clean_water_access x toilet_facility"""
+    rows = frame[row_field].array
+    columns = frame[column_field].array
+    width = len(columns.categories)
+    joint = np.bincount(
+        rows.codes.astype(np.int64) * width + columns.codes,
+        minlength=len(rows.categories) * width
+    ).reshape(len(rows.categories), width)
+    return {
+        row: {column: int(count) for column, count in zip(columns.categories, joint[index]) if count}
+        for index, row in enumerate(rows.categories)
+    }
+
+
+def village_rollups(frame: pd.DataFrame, fields: List[str], village_field: str = "village_name") -> Dict[str, dict]:
+    """Per-village totals and community_stats, computed for all villages in one pass per field"""
+    villages = frame[village_field].array
+    village_count = len(villages.categories)
+    totals = np.bincount(villages.codes, minlength=village_count)
+    rollups = {
+        village: {"total_responses": int(total), "community_stats": {}}
+        for village, total in zip(villages.categories, totals)
+    }
+    for field in fields:
+        column = frame[field].array
+        width = len(column.categories)
+        joint = np.bincount(
+            villages.codes.astype(np.int64) * width + column.codes,
+            minlength=village_count * width
+        ).reshape(village_count, width)
+        for index, village in enumerate(villages.categories):
+            rollups[village]["community_stats"][field] = _percentages(column.categories, joint[index], int(totals[index]))
+    return rollups
+
+
+def cohort_report(
+    surveys: Iterable[dict],
+    fields: List[str],
+    crosstabs: Optional[List[Tuple[str, str]]] = None,
+    village_field: str = "village_name",
+) -> dict:
+    """Distributions, requested cross-tabs and per-village rollups for a survey cohort"""
+    columns = list(dict.fromkeys([village_field, *fields, *(field for pair in crosstabs or [] for field in pair)]))
+    frame = surveys_frame(surveys, columns)
+    return {
+        "total_responses": len(frame),
+        "community_stats": field_distributions(frame, fields),
+        "crosstabs": {f"{row}:{column}": crosstab(frame, row, column) for row, column in crosstabs or []},
+        "villages": village_rollups(frame, fields, village_field) if len(frame) else {},
+    }
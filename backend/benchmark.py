@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Reproducible load benchmark for the survey API
+
+Starts the app in-process (ASGI transport, lifespan included) against a local
+MongoDB or, with --mock, a mongomock stand-in. It seeds N generate_surveys records plus
+sessions for a pool of users, then drives concurrent load at submit, my-response
+and analytics. The report is machine-readable JSON with p50/p95/p99 latency and
+throughput per scenario, so runs can be compared across changes.
+
+Usage:
+  python benchmark.py --surveys 10000 --users 200 --requests 2000 --concurrency 50
+  python benchmark.py --mock --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import generate_surveys
+
+SCENARIOS = ("submit", "my-response", "analytics")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--surveys", type=int, default=10000, help="Synthetic surveys seeded before the run")
+    parser.add_argument("--users", type=int, default=200, help="Users with sessions that generate the load")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mock", action="store_true", help="Use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark database afterwards")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args()
+
+
+def percentile(sorted_samples, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def seed(server, generator, args):
+    """Insert surveys, users and sessions straight into the benchmark database"""
+    for chunk_index, _, size in generate_surveys.chunk_tasks(args.surveys, 5000, args.seed):
+        batch = [
+            generate_surveys.stored_survey(answers, "benchmark")
+            for answers in generator.chunk(args.seed, chunk_index, size)
+        ]
+        await server.surveys_collection.insert_many(batch, ordered=False)
+
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    users = [f"bench-user-{index}" for index in range(args.users)]
+    await server.users_collection.insert_many([
+        {"id": user_id, "email": f"{user_id}@benchmark.local", "name": user_id} for user_id in users
+    ])
+    await server.sessions_collection.insert_many([
+        {"session_token": f"bench-session-{user_id}", "user_id": user_id, "expires_at": expires_at} for user_id in users
+    ])
+    return [f"bench-session-{user_id}" for user_id in users]
+
+
+def build_request(scenario, session_token, submissions, rng):
+    headers = {"X-Session-ID": session_token}
+    if scenario == "submit":
+        return "POST", "/api/survey/submit", headers, rng.choice(submissions)
+    if scenario == "my-response":
+        return "GET", "/api/survey/my-response", headers, None
+    return "GET", "/api/survey/analytics", headers, None
+
+
+async def prime_surveys(http, sessions, submissions):
+    """Give every user a survey, so my-response/analytics measure the found path"""
+    for start in range(0, len(sessions), 50):
+        responses = await asyncio.gather(*(
+            http.post("/api/survey/submit", headers={"X-Session-ID": token}, json=submissions[index % len(submissions)])
+            for index, token in enumerate(sessions[start:start + 50], start=start)
+        ))
+        for response in responses:
+            response.raise_for_status()
+
+
+async def run_scenario(http, scenario, sessions, submissions, args, rng):
+    """Fire args.requests requests from args.concurrency workers and collect latencies"""
+    remaining = iter(range(args.requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, path, headers, body = build_request(scenario, rng.choice(sessions), submissions, rng)
+            started = time.perf_counter()
+            try:
+                response = await http.request(method, path, headers=headers, json=body)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+
+
+async def main():
+    args = parse_args()
+    os.environ["DB_NAME"] = os.environ.get("BENCHMARK_DB_NAME", "survey_load_benchmark")
+    # Snapshot refreshes would compete with the measured requests
+    os.environ.setdefault("SURVEY_STATS_INTERVAL", "3600")
+    if args.mock:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--mock needs the mongomock-motor package")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *_, **__: mongomock_motor.AsyncMongoMockClient()
+
+    import httpx
+    import server
+
+    generator = generate_surveys.SurveyGenerator(
+        generate_surveys.load_distributions(None), generate_surveys.village_names(50),
+        date(2024, 1, 1), date(2024, 12, 31)
+    )
+    # Drawn from a chunk the seed never uses, so submits are real changes rather than no-op resubmissions
+    submissions = generator.chunk(args.seed, -1, 1000)
+    rng = random.Random(args.seed)
+    await server.client.drop_database(server.DB_NAME)
+    # The API only verifies indexes; a fresh database needs the migration first
+    await server.migrate_indexes()
+    sessions = await seed(server, generator, args)
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "mongo": "mongomock" if args.mock else server.MONGO_URL,
+        "config": {
+            "surveys": args.surveys,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "scenarios": [],
+    }
+    try:
+        async with server.lifespan(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+                await prime_surveys(http, sessions, submissions)
+                for scenario in args.scenarios.split(","):
+                    result = await run_scenario(http, scenario, sessions, submissions, args, rng)
+                    report["scenarios"].append(result)
+                    print(f"{scenario:>12}: {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']} ms, "
+                          f"p95 {result['latency_ms']['p95']} ms, p99 {result['latency_ms']['p99']} ms, "
+                          f"{result['errors']} errors", file=sys.stderr)
+    finally:
+        if not args.keep:
+            await server.client.drop_database(server.DB_NAME)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
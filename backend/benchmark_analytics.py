@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare Python-side and database-side community statistics
+
+Seeds a scratch database with N synthetic surveys and times:
+  python      - find({}) every survey, count_survey_fields + calculate_analytics in the API process
+  aggregation - aggregate_survey_counts ($facet with one $group per field) + calculate_analytics
+and checks that both produce equal community_stats (the same percentages; answer order
+within a field may differ, since $group buckets are unordered).
+
+Usage: python benchmark_analytics.py [--sizes 1000,10000,100000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+import server
+from generate_surveys import weighted
+from survey_choices import CHOICE_FIELDS
+
+BENCHMARK_DB_NAME = os.environ.get('BENCHMARK_DB_NAME', 'survey_benchmark')
+
+# Every multiple-choice question, drawn with the form's option weights
+CHOICE_WEIGHTS = {field: weighted(options) for field, options in CHOICE_FIELDS.items()}
+
+def synthetic_survey(rng, index):
+    """A survey document with every SurveyResponse field filled in"""
+    survey = {field: f"{field} {index}" for field in server.SurveyResponse.model_fields}
+    survey.update({
+        field: rng.choices(values, cum_weights=cum_weights)[0]
+        for field, (values, cum_weights) in CHOICE_WEIGHTS.items()
+    })
+    survey.update({"id": f"bench-{index}", "user_id": f"bench-user-{index}", "respondent_age": rng.randint(18, 90)})
+    return survey
+
+async def seed(collection, size):
+    """Top the collection up to `size` surveys"""
+    rng = random.Random(size)
+    existing = await collection.count_documents({})
+    batch = []
+    for index in range(existing, size):
+        batch.append(synthetic_survey(rng, index))
+        if len(batch) == 5000:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+async def python_stats(collection):
+    all_surveys = await collection.find({}).to_list(length=None)
+    field_counts, total = server.count_survey_fields(all_surveys)
+    return server.calculate_analytics({}, field_counts, total)["community_stats"]
+
+async def aggregation_stats(collection):
+    field_counts, total = await server.aggregate_survey_counts(collection=collection)
+    return server.calculate_analytics({}, field_counts, total)["community_stats"]
+
+async def time_call(func, collection, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await func(collection)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(timings), 2)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    collection = server.client[BENCHMARK_DB_NAME]['surveys']
+    await collection.delete_many({})
+    report = []
+    try:
+        for size in sorted(int(size) for size in args.sizes.split(",")):
+            await seed(collection, size)
+            python_result, python_ms = await time_call(python_stats, collection, args.repeat)
+            aggregation_result, aggregation_ms = await time_call(aggregation_stats, collection, args.repeat)
+            report.append({
+                "surveys": size,
+                "python_ms": python_ms,
+                "aggregation_ms": aggregation_ms,
+                "speedup": round(python_ms / aggregation_ms, 2) if aggregation_ms else None,
+                "equal": python_result == aggregation_result,
+            })
+            print(f"{'✅' if python_result == aggregation_result else '❌'} {size:>7} surveys: "
+                  f"python {python_ms} ms, aggregation {aggregation_ms} ms")
+    finally:
+        await server.client.drop_database(BENCHMARK_DB_NAME)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
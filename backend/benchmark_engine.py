@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized analytics engine against calculate_analytics
+
+Builds N synthetic surveys in memory and times:
+  python     - count_survey_fields + calculate_analytics (the request-path implementation)
+  vectorized - analytics_engine.surveys_frame + field_distributions
+and checks that community_stats are identical, key order included.
+
+Usage: python benchmark_engine.py [--sizes 10000,100000,250000] [--repeat 3]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+import analytics_engine
+import server
+from benchmark_analytics import synthetic_survey
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(timings), 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,250000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fields = server.ANALYTICS_FIELDS
+    report = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        rng = random.Random(size)
+        surveys = [synthetic_survey(rng, index) for index in range(size)]
+
+        def python_stats():
+            field_counts, total = server.count_survey_fields(surveys)
+            return server.calculate_analytics({}, field_counts, total)["community_stats"]
+
+        def vectorized_stats():
+            frame = analytics_engine.surveys_frame(surveys, fields)
+            return analytics_engine.field_distributions(frame, fields)
+
+        frame = analytics_engine.surveys_frame(surveys, fields)
+        python_result, python_ms = time_call(python_stats, args.repeat)
+        vectorized_result, vectorized_ms = time_call(vectorized_stats, args.repeat)
+        _, compute_ms = time_call(lambda: analytics_engine.field_distributions(frame, fields), args.repeat)
+        identical = json.dumps(python_result) == json.dumps(vectorized_result)
+        report.append({
+            "surveys": size,
+            "python_ms": python_ms,
+            "vectorized_ms": vectorized_ms,
+            "vectorized_compute_only_ms": compute_ms,
+            "identical": identical,
+        })
+        print(f"{'✅' if identical else '❌'} {size:>7} surveys: python {python_ms} ms, "
+              f"vectorized {vectorized_ms} ms (compute only {compute_ms} ms)")
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark the per-request CPU work of submit and my-response
+
+Times, on one core and without the database, the serialization steps each request
+pays for:
+  submit       - parse + validate the body, build the stored document, render the response
+  my-response  - render a stored survey (with its submitted_at datetime) as JSON
+comparing the previous path (json.loads + SurveyResponse(**data) + .dict() copies +
+jsonable_encoder/JSONResponse) with the current one (model_validate_json, in-place
+document, orjson). Reports requests/second per core for each, as JSON.
+
+End-to-end throughput including MongoDB is measured by benchmark.py.
+
+Usage: python benchmark_serialization.py [--iterations 20000] [--repeat 5]
+"""
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from datetime import date, datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import generate_surveys
+import server
+
+
+def previous_submit(body):
+    survey = server.SurveyResponse(**json.loads(body))
+    answers = survey.model_dump()
+    content_hash = server.survey_content_hash(answers)
+    survey_doc = {
+        "id": str(uuid.uuid4()),
+        "user_id": "user",
+        "submitted_at": datetime.now(),
+        "content_hash": content_hash,
+        **answers
+    }
+    response = {"message": "Survey submitted successfully", "survey_id": survey_doc['id'], "changed_fields": list(answers)}
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def current_submit(body):
+    answers = server.SurveyResponse.model_validate_json(body).model_dump()
+    content_hash = server.survey_content_hash(answers)
+    survey_doc = answers
+    survey_doc.update(id=str(uuid.uuid4()), user_id="user", submitted_at=datetime.now(), content_hash=content_hash)
+    response = {
+        "message": "Survey submitted successfully",
+        "survey_id": survey_doc['id'],
+        "changed_fields": server.changed_survey_fields(None, survey_doc)
+    }
+    return server.render_json(response)
+
+
+def previous_my_response(stored):
+    survey = dict(stored)
+    survey.pop('_id', None)
+    return JSONResponse(jsonable_encoder({"survey": survey})).body
+
+
+def current_my_response(stored):
+    # The _id is excluded by the find_one projection
+    return server.render_json({"survey": stored})
+
+
+def per_second(func, argument, iterations, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(argument)
+        timings.append(time.perf_counter() - started)
+    return round(iterations / statistics.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    generator = generate_surveys.SurveyGenerator(
+        generate_surveys.load_distributions(None), generate_surveys.village_names(50),
+        date(2024, 1, 1), date(2024, 12, 31)
+    )
+    answers = generator.chunk(1, 0, 1)[0]
+    body = json.dumps(answers).encode()
+    stored = {
+        **answers,
+        "id": str(uuid.uuid4()),
+        "user_id": "user",
+        "submitted_at": datetime.now().replace(microsecond=123000),
+        "content_hash": server.survey_content_hash(answers),
+    }
+    assert previous_my_response({"_id": "x", **stored}) == current_my_response(stored)
+
+    report = []
+    for name, previous, current, argument in (
+        ("submit", previous_submit, current_submit, body),
+        ("my-response", previous_my_response, current_my_response, stored),
+    ):
+        before = per_second(previous, argument, args.iterations, args.repeat)
+        after = per_second(current, argument, args.iterations, args.repeat)
+        report.append({
+            "path": name,
+            "previous_per_core_per_s": before,
+            "current_per_core_per_s": after,
+            "speedup": round(after / before, 2),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
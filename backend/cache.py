@@ -0,0 +1,217 @@
+"""
+Caches used by the API
+
+TTLCache is the in-process LRU/TTL store. The server reaches its shared caches through
+the async CacheBackend interface instead, so a deployment can choose between
+MemoryCacheBackend (per process, for a single worker) and RedisCacheBackend (one store
+for every worker, so a logout or a survey write is seen by all of them).
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import json
+import logging
+import pickle
+import time
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # redis is only needed for RedisCacheBackend
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl overrides the default lifetime but never extends it"""
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (value, time.monotonic() + lifetime)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheBackend:
+    """Async get/set/delete interface shared by the cache implementations"""
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    async def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Get and delete in one step, so only one caller ever receives the value"""
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """TTLCache of the current process behind the async interface"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.cache.get(key, default)
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: Hashable) -> None:
+        self.cache.delete(key)
+
+    async def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self.cache.get(key, default)
+        self.cache.delete(key)
+        return value
+
+    async def stats(self) -> dict:
+        return {"backend": "memory", **self.cache.stats()}
+
+
+def redis_client(url: str):
+    """Connection pool for RedisCacheBackend instances to share"""
+    import redis.asyncio
+
+    return redis.asyncio.from_url(url)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache kept in Redis (or any server speaking its protocol) under a key namespace
+
+    Keys must be JSON-encodable (strings, numbers and tuples of them); values are
+    pickled, so the Redis server must be trusted. Eviction is left to Redis's
+    maxmemory policy. Hit/miss counters are per process. Errors talking to Redis are
+    logged and treated as misses, so an outage falls back to reading MongoDB.
+    """
+
+    def __init__(self, client, namespace: str, ttl: float = 60.0):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{json.dumps(key, separators=(',', ':'))}"
+
+    def _failed(self, operation: str, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning("Redis cache %s %s failed: %s", self.namespace, operation, exc)
+
+    def _loaded(self, raw, default):
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(raw)
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            raw = await self.client.get(self._key(key))
+        except RedisError as exc:
+            self._failed("get", exc)
+            raw = None
+        return self._loaded(raw, default)
+
+    async def pop(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            raw = await self.client.getdel(self._key(key))
+        except RedisError as exc:
+            self._failed("pop", exc)
+            raw = None
+        return self._loaded(raw, default)
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl overrides the default lifetime but never extends it"""
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0:
+            await self.delete(key)
+            return
+        try:
+            await self.client.set(self._key(key), pickle.dumps(value), px=max(1, int(lifetime * 1000)))
+        except RedisError as exc:
+            self._failed("set", exc)
+
+    async def delete(self, key: Hashable) -> None:
+        try:
+            await self.client.delete(self._key(key))
+        except RedisError as exc:
+            self._failed("delete", exc)
+
+    async def _redis_keys(self) -> list:
+        return [key async for key in self.client.scan_iter(match=f"{self.namespace}:*", count=1000)]
+
+    async def stats(self) -> dict:
+        """Shared size plus this worker's hit/miss counters"""
+        try:
+            size = len(await self._redis_keys())
+        except RedisError as exc:
+            self._failed("stats", exc)
+            size = None
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "size": size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
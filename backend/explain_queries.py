@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Print the query plan of every endpoint query
+
+Usage: python explain_queries.py [--migrate-indexes]
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+
+import server
+
+# Keyset condition list_surveys adds for every page after the first
+LISTING_AFTER = {"$or": [
+    {"submitted_at": {"$lt": datetime(2024, 5, 1)}},
+    {"submitted_at": datetime(2024, 5, 1), "id": {"$lt": "explain"}}
+]}
+
+# (endpoint, collection, filter, sort) for each query the API issues
+ENDPOINT_QUERIES = [
+    ("get_current_user", server.sessions_collection, {"session_token": "explain"}, None),
+    ("get_current_user", server.users_collection, {"id": "explain"}, None),
+    ("auth_profile", server.users_collection, {"email": "explain@example.com"}, None),
+    ("submit_survey", server.surveys_collection, {"user_id": "explain"}, None),
+    ("get_my_survey", server.surveys_collection, {"user_id": "explain"}, None),
+    ("get_analytics", server.surveys_collection, {"user_id": "explain"}, None),
+    # Scans the counter store, which holds one document per distinct answer
+    ("get_analytics", server.counters_collection, {"count": {"$gt": 0}}, None),
+    ("list_surveys", server.surveys_collection, LISTING_AFTER, server.LISTING_SORT),
+    ("list_surveys", server.surveys_collection, {"village_name": "explain", **LISTING_AFTER}, server.LISTING_SORT),
+    ("list_surveys", server.surveys_collection, {"date": "2024-05-01", **LISTING_AFTER}, server.LISTING_SORT),
+    # Segment filters shared by analytics, cohort and suggestions; aggregate $match plans like find()
+    ("get_analytics", server.surveys_collection, server.segment_match({"village_name": "explain"}), None),
+    ("get_analytics", server.surveys_collection,
+     server.segment_match({"date_from": "2024-01-01", "date_to": "2024-12-31", "age_min": 18}), None),
+    ("bulk_submit_surveys", server.surveys_collection, {"id": {"$in": ["explain"]}, "collected_by": "explain"}, None),
+]
+
+def plan_stages(plan):
+    """Flatten a winning plan into its stage names, outermost first
+
+    $or plans (OR, SORT_MERGE) have one input per branch; every branch is listed so
+    a collection scan behind the second keyset condition is not hidden.
+    """
+    stages = []
+    pending = [plan]
+    while pending:
+        plan = pending.pop(0)
+        if not plan:
+            continue
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        pending[:0] = plan.get('inputStages') or [plan.get('inputStage')]
+    return stages
+
+async def main():
+    if "--migrate-indexes" in sys.argv:
+        missing = await server.migrate_indexes()
+        print(f"Index bootstrap: {'OK' if not missing else 'missing ' + ', '.join(missing)}")
+
+    for endpoint, collection, query, sort in ENDPOINT_QUERIES:
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(1).explain()
+        winning_plan = explain['queryPlanner']['winningPlan']
+        # Slot-based engine wraps the classic plan in queryPlan
+        stages = plan_stages(winning_plan.get('queryPlan', winning_plan))
+        marker = "⚠️ " if any(stage.startswith("COLLSCAN") for stage in stages) else "✅"
+        print(f"{marker} {endpoint:<18} {collection.name:<16} {query} sort={sort} -> {' <- '.join(stages)}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Generate plausible synthetic surveys for scale testing
+
+Every SurveyResponse field is filled in: multiple-choice answers are drawn from
+the options the survey form offers (the same values generate_suggestions matches,
+e.g. "Open defecation" or "Rarely"), with per-field weights that can be overridden
+from a JSON file. Villages get skewed sizes and dates are spread over a range.
+
+Records are produced in fixed-size chunks by a process pool. Each chunk has its own
+seed, so the output for a given --seed is identical whatever the worker count.
+The output is streamed as NDJSON (ready for POST /api/survey/bulk) or inserted
+straight into MONGO_URL/DB_NAME, after which the counter store is rebuilt.
+
+Usage:
+  python generate_surveys.py --count 1000000 --output surveys.ndjson
+  python generate_surveys.py --count 1000000 --insert --workers 8
+  python generate_surveys.py --count 1000 --distributions weights.json --villages 20 \\
+      --start-date 2024-01-01 --end-date 2024-06-30 --output -
+
+weights.json maps field -> {option: weight}; listed options replace the defaults'
+weights for that field, e.g. {"toilet_facility": {"Open defecation": 5}}.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import uuid
+from datetime import date, datetime, timedelta
+
+from survey_choices import CHOICE_FIELDS
+
+FIRST_NAMES = ["Aarav", "Ananya", "Arjun", "Bhavya", "Deepak", "Divya", "Ganesh", "Harini", "Karthik", "Lakshmi",
+               "Manoj", "Meena", "Nikhil", "Padma", "Ravi", "Sanjana", "Srinivas", "Swathi", "Venkat", "Yamini"]
+LAST_NAMES = ["Reddy", "Rao", "Naidu", "Sharma", "Kumar", "Patel", "Iyer", "Das", "Verma", "Goud"]
+FULL_NAMES = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+OCCUPATIONS = {"Farmer": 30, "Daily wage labourer": 20, "Homemaker": 18, "Shopkeeper": 10, "Student": 8,
+               "Teacher": 4, "Driver": 5, "Unemployed": 5}
+HEALTH_ISSUES = {"Fever": 25, "Cold and cough": 25, "Diarrhoea": 15, "Skin infections": 10, "Malaria": 8,
+                 "Typhoid": 7, "None": 10}
+HYGIENE_ISSUES = {"Lack of clean water": 30, "Open drains": 25, "Garbage dumping": 20, "No toilets": 15,
+                  "Mosquitoes": 10}
+COMMENTS = {"": 80, "Need more awareness programs": 8, "Water supply is irregular": 7, "Drainage needs repair": 5}
+
+CHUNK_SIZE = 10000
+
+
+def weighted(options):
+    """(values, cumulative weights) for random.choices"""
+    values = list(options)
+    return values, list(itertools.accumulate(options[value] for value in values))
+
+
+def load_distributions(path):
+    """Default weights with the per-field overrides from a JSON file applied"""
+    distributions = {field: dict(options) for field, options in CHOICE_FIELDS.items()}
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        for field, options in overrides.items():
+            if field not in distributions:
+                raise ValueError(f"Unknown multiple-choice field: {field}")
+            distributions[field].update(options)
+    return distributions
+
+
+def village_names(count, names=None):
+    """Village names with Zipf-like weights, so a few villages hold most responses"""
+    names = names or [f"Village {index:03d}" for index in range(1, count + 1)]
+    return {name: 1 / rank for rank, name in enumerate(names, start=1)}
+
+
+def chunk_seed(seed, chunk_index):
+    return int.from_bytes(hashlib.sha256(f"{seed}:{chunk_index}".encode()).digest()[:8], "big")
+
+
+def content_hash(answers):
+    """Same digest as server.survey_content_hash, so resubmitting a generated record is a no-op"""
+    return hashlib.sha256(json.dumps(answers, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class SurveyGenerator:
+    def __init__(self, distributions, villages, start_date, end_date):
+        self.choices = {field: weighted(options) for field, options in distributions.items()}
+        self.villages = weighted(villages)
+        self.occupations = weighted(OCCUPATIONS)
+        self.health_issues = weighted(HEALTH_ISSUES)
+        self.hygiene_issues = weighted(HYGIENE_ISSUES)
+        self.comments = weighted(COMMENTS)
+        self.dates = [(start_date + timedelta(days=day)).isoformat() for day in range((end_date - start_date).days + 1)]
+
+    def chunk(self, seed, chunk_index, size):
+        """`size` SurveyResponse-shaped dicts, drawn column by column (one choices() call per field)"""
+        rng = random.Random(chunk_seed(seed, chunk_index))
+
+        def column(choice):
+            values, cum_weights = choice
+            return rng.choices(values, cum_weights=cum_weights, k=size)
+
+        def phone_numbers():
+            return [f"9{rng.randrange(10 ** 9):09d}" for _ in range(size)]
+
+        columns = {
+            "village_name": column(self.villages),
+            "date": rng.choices(self.dates, k=size),
+            "student_name": rng.choices(FULL_NAMES, k=size),
+            "contact_number": phone_numbers(),
+            "respondent_name": rng.choices(FULL_NAMES, k=size),
+            "respondent_age": [int(rng.triangular(18, 85, 35)) for _ in range(size)],
+            "respondent_occupation": column(self.occupations),
+            "respondent_contact": [number if rng.random() < 0.6 else "" for number in phone_numbers()],
+            "common_health_issues": column(self.health_issues),
+            "biggest_hygiene_issue": column(self.hygiene_issues),
+            "additional_comments": column(self.comments),
+        }
+        for field, choice in self.choices.items():
+            columns[field] = column(choice)
+        fields = list(columns)
+        return [dict(zip(fields, row)) for row in zip(*columns.values())]
+
+
+def stored_survey(answers, collected_by):
+    """Document shape written by POST /api/survey/bulk"""
+    return {
+        **answers,
+        "id": str(uuid.uuid4()),
+        "collected_by": collected_by,
+        "submitted_at": datetime.now(),
+        "content_hash": content_hash(answers),
+    }
+
+
+# Per-process state, set up by the pool initializer
+_generator = None
+_collection = None
+
+
+def _init_worker(generator, mongo_url, db_name):
+    global _generator, _collection
+    _generator = generator
+    if mongo_url:
+        from pymongo import MongoClient
+        _collection = MongoClient(mongo_url)[db_name]["surveys"]
+
+
+def _ndjson_chunk(task):
+    seed, chunk_index, size = task
+    return "".join(json.dumps(survey) + "\n" for survey in _generator.chunk(seed, chunk_index, size))
+
+
+def _insert_chunk(task):
+    seed, chunk_index, size, collected_by = task
+    documents = [stored_survey(answers, collected_by) for answers in _generator.chunk(seed, chunk_index, size)]
+    _collection.insert_many(documents, ordered=False)
+    return len(documents)
+
+
+def chunk_tasks(count, chunk_size, seed):
+    for chunk_index, start in enumerate(range(0, count, chunk_size)):
+        yield seed, chunk_index, min(chunk_size, count - start)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="NDJSON file to write, or - for stdout")
+    target.add_argument("--insert", action="store_true", help="Insert into MONGO_URL/DB_NAME instead")
+    parser.add_argument("--distributions", help="JSON file with per-field answer weights")
+    parser.add_argument("--villages", type=int, default=50, help="Number of generated village names")
+    parser.add_argument("--village-names", help="Comma-separated village names (overrides --villages)")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2024, 1, 1))
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date(2024, 12, 31))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--collected-by", default="generator", help="collected_by recorded on inserted surveys")
+    args = parser.parse_args()
+    if args.end_date < args.start_date:
+        parser.error("--end-date is before --start-date")
+    return args
+
+
+def main():
+    args = parse_args()
+    names = args.village_names.split(",") if args.village_names else None
+    generator = SurveyGenerator(
+        load_distributions(args.distributions), village_names(args.villages, names), args.start_date, args.end_date
+    )
+    tasks = chunk_tasks(args.count, args.chunk_size, args.seed)
+    started = datetime.now()
+
+    if args.insert:
+        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+        db_name = os.environ.get('DB_NAME', 'test_database')
+        with multiprocessing.Pool(args.workers, _init_worker, (generator, mongo_url, db_name)) as pool:
+            inserted = sum(pool.imap_unordered(_insert_chunk, (task + (args.collected_by,) for task in tasks)))
+
+        # Counters and snapshots only track API writes; recompute them for the new data
+        import asyncio
+        import server
+        if not asyncio.run(server.rebuild_survey_counters()):
+            print("Another process is rebuilding the survey counters; they will include these surveys "
+                  "only if it started after the insert", file=sys.stderr)
+        asyncio.run(server.refresh_survey_stats())
+        print(f"Inserted {inserted} surveys into {db_name} in {datetime.now() - started}", file=sys.stderr)
+        return
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        with multiprocessing.Pool(args.workers, _init_worker, (generator, None, None)) as pool:
+            # imap keeps chunk order, so the file is reproducible for a given seed
+            for lines in pool.imap(_ndjson_chunk, tasks):
+                output.write(lines)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Wrote {args.count} surveys in {datetime.now() - started}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
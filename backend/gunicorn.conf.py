@@ -0,0 +1,41 @@
+"""
+Production entry point: the API as several uvicorn worker processes under gunicorn
+
+Usage (from the backend directory):
+  gunicorn -c gunicorn.conf.py server:app
+
+Every worker is a separate process with its own event loop, MongoDB connection pool
+(MONGO_MAX_POOL_SIZE each) and in-memory state. So that all workers agree, a
+multi-worker deployment should set:
+  CACHE_BACKEND=redis, REDIS_URL=...   sessions, segment stats, ETag versions, analytics
+                                       responses and idempotency keys live in one Redis
+                                       instead of per process; a logout or survey write
+                                       is then seen by every worker immediately
+  LIVE_STATS_CHANGE_STREAM=1           live stats follow the counter store's change
+                                       stream (needs a replica set), so SSE subscribers
+                                       see writes handled by any worker
+With the defaults each worker only notices the others' writes once its cached entries
+expire (SESSION_CACHE_TTL, SURVEY_VERSION_TTL, SEGMENT_CACHE_TTL).
+
+Settings:
+  WEB_CONCURRENCY   number of workers (default: one per CPU core)
+  PORT              listen port (default 8001, same as python server.py)
+  BIND              full bind address, overrides PORT
+  GUNICORN_TIMEOUT  seconds before a silent worker is restarted (default 60)
+  GUNICORN_MAX_REQUESTS  requests after which a worker is replaced (default 10000)
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8001')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so a slow leak cannot grow without bound
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,145 @@
+"""
+In-memory community stats fanned out to live subscribers (SSE)
+
+The hub keeps per-field answer counts and applies either relative deltas published
+in-process by the write path, or absolute counts read from a change stream on the
+counter store. Updates are coalesced: at most one broadcast per interval, serialized
+once and shared by every subscriber. Each subscriber has a one-slot queue, so a slow
+client only ever holds the latest snapshot (older ones are dropped, never buffered).
+"""
+
+from typing import AsyncIterable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class LiveStatsHub:
+    def __init__(
+        self,
+        render: Callable[[Dict[str, Dict[str, int]], int], dict],
+        total_key: str = "_total",
+        coalesce_interval: float = 1.0,
+        max_subscribers: int = 1000,
+    ):
+        self.render = render
+        self.total_key = total_key
+        self.coalesce_interval = coalesce_interval
+        self.max_subscribers = max_subscribers
+        self.field_counts: Dict[str, Dict[str, int]] = {}
+        self.total_responses = 0
+        self.sequence = 0
+        self.broadcasts = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._changed = asyncio.Event()
+        self._payload: Optional[str] = None
+
+    def reset(self, field_counts: Dict[str, Dict[str, int]], total_responses: int) -> None:
+        """Replace the aggregate, e.g. with a fresh read of the counter store"""
+        self.field_counts = {field: dict(counts) for field, counts in field_counts.items()}
+        self.total_responses = total_responses
+        self._mark_changed()
+
+    def apply_deltas(self, deltas: Dict[Tuple[str, str], int], total_delta: int) -> None:
+        """Apply relative (field, value) count changes published by the write path"""
+        for (field, value), delta in deltas.items():
+            counts = self.field_counts.setdefault(field, {})
+            counts[value] = counts.get(value, 0) + delta
+            if counts[value] <= 0:
+                del counts[value]
+        self.total_responses += total_delta
+        if deltas or total_delta:
+            self._mark_changed()
+
+    def apply_counter_change(self, change: dict) -> None:
+        """Apply a change-stream event from the counter store (absolute counts, so replays are harmless)"""
+        counter_id = change.get("documentKey", {}).get("_id")
+        if counter_id is None:
+            return
+        if change.get("operationType") == "delete":
+            count = 0
+        else:
+            count = (change.get("fullDocument") or {}).get("count")
+            if count is None:
+                return
+        if counter_id == self.total_key:
+            self.total_responses = count
+        elif isinstance(counter_id, dict) and "field" in counter_id:
+            counts = self.field_counts.setdefault(counter_id["field"], {})
+            if count > 0:
+                counts[counter_id["value"]] = count
+            else:
+                counts.pop(counter_id["value"], None)
+        else:
+            return
+        self._mark_changed()
+
+    async def consume_change_stream(self, stream: AsyncIterable[dict]) -> None:
+        """Apply every event of a change stream (or any stand-in async iterable)"""
+        async for change in stream:
+            self.apply_counter_change(change)
+
+    def payload(self) -> str:
+        """Current snapshot, serialized once per change"""
+        if self._payload is None:
+            self._payload = json.dumps({
+                "sequence": self.sequence,
+                "total_responses": self.total_responses,
+                "community_stats": self.render(self.field_counts, self.total_responses),
+            })
+        return self._payload
+
+    def _mark_changed(self) -> None:
+        self.sequence += 1
+        self._payload = None
+        self._changed.set()
+
+    def broadcast(self) -> None:
+        """Offer the latest snapshot to every subscriber, replacing any undelivered one"""
+        payload = self.payload()
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(payload)
+        self.broadcasts += 1
+
+    async def run(self) -> None:
+        """Broadcast at most once per coalesce_interval while changes keep arriving"""
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.coalesce_interval)
+            self._changed.clear()
+            self.broadcast()
+
+    def has_capacity(self) -> bool:
+        return len(self._subscribers) < self.max_subscribers
+
+    def reserve(self) -> asyncio.Queue:
+        """Register a subscriber queue, pre-loaded with the current snapshot
+
+        Synchronous, so the capacity check and the registration cannot be interleaved
+        with another subscriber's.
+        """
+        if not self.has_capacity():
+            raise TooManySubscribers()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait(self.payload())
+        self._subscribers.add(queue)
+        return queue
+
+    def release(self, queue: asyncio.Queue) -> None:
+        """Unregister a subscriber queue; releasing twice is harmless"""
+        self._subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "sequence": self.sequence,
+            "broadcasts": self.broadcasts,
+            "dropped": self.dropped,
+        }
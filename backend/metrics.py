@@ -0,0 +1,158 @@
+"""
+Request, MongoDB and outbound-call instrumentation rendered in the Prometheus
+text exposition format
+
+Per-request figures (DB op count/time, auth call time) are gathered on a
+RequestStats object held in a context variable. Motor runs driver calls on an
+executor with a copy of the caller's context, so the command listener below
+sees the stats object of the request that issued the command.
+"""
+
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+import bisect
+import threading
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("db_ops", "db_seconds", "auth_calls", "auth_seconds")
+
+    def __init__(self):
+        self.db_ops = 0
+        self.db_seconds = 0.0
+        self.auth_calls = 0
+        self.auth_seconds = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            bucket_labels = _labels(self.label_names, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+http_request_db_ops = Counter(
+    "http_request_db_operations_total", "MongoDB commands issued while serving each route", ("route",)
+)
+mongo_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("command", "outcome")
+)
+auth_call_duration = Histogram(
+    "auth_upstream_duration_seconds", "Emergent Auth session-data call latency", ("outcome",)
+)
+
+ALL_METRICS = (http_request_duration, http_request_db_ops, mongo_command_duration, auth_call_duration)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Counts driver commands globally and on the issuing request's RequestStats"""
+
+    def started(self, event):
+        pass
+
+    def _finished(self, event, outcome):
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration.observe(seconds, (event.command_name, outcome))
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.db_ops += 1
+            stats.db_seconds += seconds
+
+    def succeeded(self, event):
+        self._finished(event, "success")
+
+    def failed(self, event):
+        self._finished(event, "failure")
+
+
+command_listener = MongoCommandListener()
+
+
+def observe_auth_call(seconds: float, outcome: str) -> None:
+    auth_call_duration.observe(seconds, (outcome,))
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.auth_calls += 1
+        stats.auth_seconds += seconds
+
+
+def render(extra_gauges: Iterable[Tuple[str, str, Dict[Tuple[Tuple[str, str], ...], float]]] = ()) -> str:
+    """All metrics plus (name, help, {label pairs: value}) gauges in text exposition format"""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    for name, help_text, samples in extra_gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for label_pairs, sample in samples.items():
+            names = tuple(label for label, _ in label_pairs)
+            values = tuple(label_value for _, label_value in label_pairs)
+            lines.append(f"{name}{_labels(names, values)} {sample}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Create the declared MongoDB indexes and rebuild any whose definition changed
+
+Run once per deploy, before starting the API workers (which only verify indexes).
+
+Usage: python migrate_indexes.py
+"""
+
+import asyncio
+import logging
+import sys
+
+import server
+
+async def main():
+    missing = await server.migrate_indexes()
+    server.client.close()
+    if missing:
+        print(f"Missing or mismatched indexes: {', '.join(missing)}")
+        return 1
+    print(f"{len(server.INDEXES)} indexes OK")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
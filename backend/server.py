@@ -1,15 +1,70 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
 from typing import Optional, List, Dict, Any
 import os
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from contextlib import asynccontextmanager
+from types import MappingProxyType
 import uuid
 from datetime import datetime, timedelta
-import requests
+import asyncio
+import random
+import httpx
 import json
+import hashlib
+import logging
+import csv
+import io
+import zlib
+import orjson
+import base64
+import secrets
+import time
+import jwt
+from cache import MemoryCacheBackend, RedisCacheBackend, TTLCache, redis_client
+from live_stats import LiveStatsHub, TooManySubscribers
+from survey_codec import SurveyCodec
+from survey_choices import CHOICE_FIELDS
+from session_tokens import RevocationList
+import session_tokens
+import analytics_engine
+import metrics
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global auth_http_client
+    auth_http_client = create_auth_http_client()
+    missing_indexes = await verify_indexes()
+    if missing_indexes:
+        logger.error("Indexes missing or mismatched: %s (run migrate_indexes.py)", ", ".join(missing_indexes))
+    await survey_codec.load()
+    if SESSION_TOKEN_MODE == 'jwt':
+        await revocation_list.load()
+    await ensure_survey_counters()
+    live_stats.reset(*await load_survey_counters())
+    background_tasks = [asyncio.create_task(live_stats.run())]
+    if LIVE_STATS_CHANGE_STREAM:
+        background_tasks.append(asyncio.create_task(watch_survey_counters()))
+    # Build snapshots right away instead of after the first interval
+    survey_stats_changed.set()
+    background_tasks.append(asyncio.create_task(refresh_survey_stats_loop()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await auth_http_client.aclose()
+    if cache_redis is not None:
+        await cache_redis.aclose()
+    client.close()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS setup
 app.add_middleware(
@@ -18,19 +73,325 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Log requests slower than this many milliseconds (0 disables)
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+
+class RequestMetricsMiddleware:
+    """Per-route latency histogram plus DB/auth time attributed to each request
+
+    A pure ASGI middleware rather than @app.middleware("http"): BaseHTTPMiddleware hands
+    back a StreamingResponse before its body is sent, which would time exports and the
+    live stream to their headers and miss the cursor reads made while streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = metrics.RequestStats()
+        token = metrics.current_request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+        finished = None
+
+        async def send_and_observe(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            # Background tasks run after the last body chunk and are not part of the latency
+            elapsed = (finished or time.perf_counter()) - started
+            metrics.current_request_stats.reset(token)
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            metrics.http_request_duration.observe(elapsed, (scope["method"], route_path, str(status)))
+            metrics.http_request_db_ops.inc((route_path,), stats.db_ops)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning(
+                    "Slow request %s %s -> %s in %.1f ms (db: %d ops, %.1f ms; auth: %d calls, %.1f ms)",
+                    scope["method"], route_path, status, elapsed * 1000,
+                    stats.db_ops, stats.db_seconds * 1000, stats.auth_calls, stats.auth_seconds * 1000
+                )
+
+app.add_middleware(RequestMetricsMiddleware)
+
 # MongoDB setup
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 DB_NAME = os.environ.get('DB_NAME', 'test_database')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
 
-client = MongoClient(MONGO_URL)
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    event_listeners=[metrics.command_listener]
+)
 db = client[DB_NAME]
 
 # Collections
 users_collection = db['users']
 sessions_collection = db['sessions']
+revoked_sessions_collection = db['revoked_sessions']
 surveys_collection = db['surveys']
+counters_collection = db['survey_counters']
+stats_collection = db['survey_stats']
+codes_collection = db['survey_codes']
+
+# Fields summarised in community_stats
+ANALYTICS_FIELDS = [
+    "doctor_visits", "hand_washing", "medicines_available",
+    "clean_water_access", "healthcare_affordability"
+]
+TOTAL_COUNTER_ID = "_total"
+
+# Multiple-choice SurveyResponse fields, dictionary-encoded to integer codes in "encoded" storage mode
+CATEGORICAL_FIELDS = list(CHOICE_FIELDS)
+# "document" stores answers as strings; "encoded" stores the form's options of
+# CATEGORICAL_FIELDS as codes and anything else in them as text.
+# Reads decode either form, so the mode can be switched on over existing data.
+SURVEY_STORAGE_MODE = os.environ.get('SURVEY_STORAGE_MODE', 'document')
+if SURVEY_STORAGE_MODE not in ("document", "encoded"):
+    raise ValueError(f"SURVEY_STORAGE_MODE must be 'document' or 'encoded', not {SURVEY_STORAGE_MODE!r}")
+survey_codec = SurveyCodec(codes_collection, CHOICE_FIELDS)
+# Bumped on every survey write; versions cached community responses
+VERSION_COUNTER_ID = "_version"
+# Held in the counter store while it is recounted, so only one process rebuilds at a time
+COUNTER_REBUILD_LOCK_ID = "_rebuild_lock"
+COUNTER_REBUILD_LOCK_TIMEOUT = float(os.environ.get('COUNTER_REBUILD_LOCK_TIMEOUT', '600'))
+COUNTER_REBUILD_ATTEMPTS = 3
+COUNTER_REBUILD_POLL_INTERVAL = 0.5
+
+# Indexes backing every endpoint query: (collection, keys, options)
+INDEXES = [
+    (users_collection, [("id", 1)], {"name": "id_unique", "unique": True}),
+    (users_collection, [("email", 1)], {"name": "email_unique", "unique": True}),
+    (sessions_collection, [("session_token", 1)], {"name": "session_token_unique", "unique": True}),
+    # Expired sessions are purged by the TTL monitor (expires_at is stored as naive UTC)
+    (sessions_collection, [("expires_at", 1)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    # Revoked signed tokens are kept only until the token itself expires
+    (revoked_sessions_collection, [("expires_at", 1)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    (revoked_sessions_collection, [("revoked_at", 1)], {"name": "revoked_at"}),
+    # Sparse: surveys ingested through /api/survey/bulk have collected_by instead of user_id
+    (surveys_collection, [("user_id", 1)], {"name": "user_id_unique", "unique": True, "sparse": True}),
+    (surveys_collection, [("id", 1)], {"name": "id_unique", "unique": True}),
+    # Segment filters on /api/survey/analytics
+    (surveys_collection, [("village_name", 1), ("date", 1)], {"name": "village_name_date"}),
+    (surveys_collection, [("date", 1)], {"name": "date"}),
+    (surveys_collection, [("respondent_age", 1)], {"name": "respondent_age"}),
+    (surveys_collection, [("collected_by", 1)], {"name": "collected_by"}),
+    # Keyset pagination for /api/admin/surveys
+    (surveys_collection, [("submitted_at", -1), ("id", -1)], {"name": "submitted_at_id"}),
+    (surveys_collection, [("village_name", 1), ("submitted_at", -1), ("id", -1)], {"name": "village_name_submitted_at_id"}),
+    (surveys_collection, [("date", 1), ("submitted_at", -1), ("id", -1)], {"name": "date_submitted_at_id"}),
+    (stats_collection, [("scope", 1), ("village_name", 1)], {"name": "scope_village_name"}),
+    (codes_collection, [("field", 1), ("code", 1)], {"name": "field_code_unique", "unique": True}),
+]
+INDEX_OPTION_KEYS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+def index_matches(existing, keys, options):
+    """Check an entry from index_information() against a declared index"""
+    if [tuple(key) for key in existing['key']] != [tuple(key) for key in keys]:
+        return False
+    return all(existing.get(option) == options.get(option) for option in INDEX_OPTION_KEYS)
+
+async def verify_indexes():
+    """Names of declared indexes that are missing or whose definition drifted"""
+    missing = []
+    for collection, keys, options in INDEXES:
+        existing = (await collection.index_information()).get(options['name'])
+        if existing is None or not index_matches(existing, keys, options):
+            missing.append(f"{collection.name}.{options['name']}")
+    return missing
+
+async def migrate_indexes():
+    """Create declared indexes and rebuild ones whose definition drifted
+
+    Dropping an index is not something every worker should race to do on startup,
+    so this runs once per deploy from migrate_indexes.py; the API only verifies.
+    """
+    for collection, keys, options in INDEXES:
+        existing = (await collection.index_information()).get(options['name'])
+        if existing is not None and not index_matches(existing, keys, options):
+            logger.warning("Rebuilding index %s.%s with new definition", collection.name, options['name'])
+            await collection.drop_index(options['name'])
+        try:
+            await collection.create_index(keys, **options)
+        except OperationFailure as exc:
+            logger.error("Could not create index %s.%s: %s", collection.name, options['name'], exc)
+
+    missing = await verify_indexes()
+    if missing:
+        logger.error("Indexes missing or mismatched after migration: %s", ", ".join(missing))
+    return missing
+
+# Accounts allowed to use admin endpoints (comma separated emails)
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+# Bearer token for Prometheus scrapes of /api/metrics; without it only admin sessions can read metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Survey export
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+# Cohort analytics loads the segment into one DataFrame; larger segments must be narrowed
+COHORT_MAX_SURVEYS = int(os.environ.get('COHORT_MAX_SURVEYS', '200000'))
+
+# Bulk ingestion
+SURVEY_BULK_CHUNK_SIZE = int(os.environ.get('SURVEY_BULK_CHUNK_SIZE', '1000'))
+SURVEY_BULK_MAX_RECORDS = int(os.environ.get('SURVEY_BULK_MAX_RECORDS', '50000'))
+# Decoded size cap for JSON-array bodies, which are parsed whole; NDJSON is streamed,
+# so only each record's line is capped
+SURVEY_BULK_MAX_BYTES = int(os.environ.get('SURVEY_BULK_MAX_BYTES', str(32 * 1024 * 1024)))
+SURVEY_BULK_MAX_LINE_BYTES = int(os.environ.get('SURVEY_BULK_MAX_LINE_BYTES', str(256 * 1024)))
+# Per-record results returned in full; the summary still counts every record
+SURVEY_BULK_MAX_RESULTS = int(os.environ.get('SURVEY_BULK_MAX_RESULTS', '1000'))
+
+# Offline queue sync batches (limits apply after decompression)
+SURVEY_SYNC_MAX_ITEMS = int(os.environ.get('SURVEY_SYNC_MAX_ITEMS', '100'))
+SURVEY_SYNC_MAX_BYTES = int(os.environ.get('SURVEY_SYNC_MAX_BYTES', str(1024 * 1024)))
+
+# Cache backend for the caches below: "memory" keeps them per process, "redis" shares
+# them between workers (required for coherent sessions/analytics with WEB_CONCURRENCY > 1)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'health-survey')
+
+if CACHE_BACKEND not in ('memory', 'redis'):
+    raise ValueError(f"CACHE_BACKEND must be 'memory' or 'redis', not {CACHE_BACKEND!r}")
+
+cache_redis = redis_client(REDIS_URL) if CACHE_BACKEND == 'redis' else None
+
+def make_cache(name, maxsize, ttl):
+    """Cache backend selected by CACHE_BACKEND (maxsize only bounds the in-memory one)"""
+    if cache_redis is not None:
+        return RedisCacheBackend(cache_redis, f"{CACHE_KEY_PREFIX}:{name}", ttl=ttl)
+    return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+
+# Session -> user resolution cache
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', '60'))
+
+session_cache = make_cache('session', SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+# Session tokens: "opaque" tokens are looked up in the sessions collection on every cache
+# miss; "jwt" tokens are signed and verified locally, with logouts kept in a revocation
+# list. Opaque tokens issued before switching to "jwt" keep working until they expire.
+SESSION_TOKEN_MODE = os.environ.get('SESSION_TOKEN_MODE', 'opaque')
+SESSION_JWT_SECRET = os.environ.get('SESSION_JWT_SECRET', '')
+SESSION_JWT_ALGORITHM = os.environ.get('SESSION_JWT_ALGORITHM', 'HS256')
+SESSION_LIFETIME = timedelta(days=float(os.environ.get('SESSION_LIFETIME_DAYS', '7')))
+# How stale a worker's copy of the revocation list may get
+SESSION_REVOCATION_REFRESH = float(os.environ.get('SESSION_REVOCATION_REFRESH', '10'))
+
+if SESSION_TOKEN_MODE not in ('opaque', 'jwt'):
+    raise ValueError(f"SESSION_TOKEN_MODE must be 'opaque' or 'jwt', not {SESSION_TOKEN_MODE!r}")
+if SESSION_TOKEN_MODE == 'jwt' and not SESSION_JWT_SECRET:
+    raise ValueError("SESSION_JWT_SECRET is required when SESSION_TOKEN_MODE is 'jwt'")
+
+revocation_list = RevocationList(revoked_sessions_collection, refresh_interval=SESSION_REVOCATION_REFRESH)
+
+# Filtered (segment) community stats cache
+SEGMENT_CACHE_SIZE = int(os.environ.get('SEGMENT_CACHE_SIZE', '256'))
+SEGMENT_CACHE_TTL = float(os.environ.get('SEGMENT_CACHE_TTL', '300'))
+
+segment_cache = make_cache('segment', SEGMENT_CACHE_SIZE, SEGMENT_CACHE_TTL)
+# Per-village stamps the cached segments are checked against; a write deletes its villages'
+# stamps instead of scanning the segment cache (a lost stamp only forces a recount)
+segment_stamp_cache = make_cache('segment_stamp', SEGMENT_CACHE_SIZE, SEGMENT_CACHE_TTL)
+
+# Replayed submissions, keyed by (user id, Idempotency-Key)
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000'))
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', '86400'))
+
+idempotency_cache = make_cache('idempotency', IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)
+
+# Response versioning (ETag) caches
+SURVEY_VERSION_CACHE_SIZE = int(os.environ.get('SURVEY_VERSION_CACHE_SIZE', '10000'))
+SURVEY_VERSION_TTL = float(os.environ.get('SURVEY_VERSION_TTL', '30'))
+COMMUNITY_VERSION_TTL = float(os.environ.get('COMMUNITY_VERSION_TTL', '2'))
+ANALYTICS_RESPONSE_CACHE_SIZE = int(os.environ.get('ANALYTICS_RESPONSE_CACHE_SIZE', '1024'))
+
+survey_version_cache = make_cache('survey_version', SURVEY_VERSION_CACHE_SIZE, SURVEY_VERSION_TTL)
+# Short-lived memo of a Mongo counter; each worker keeps its own
+community_version_cache = TTLCache(maxsize=1, ttl=COMMUNITY_VERSION_TTL)
+analytics_response_cache = make_cache('analytics_response', ANALYTICS_RESPONSE_CACHE_SIZE, SEGMENT_CACHE_TTL)
+
+# Materialized per-village/global snapshots in survey_stats
+SURVEY_STATS_INTERVAL = float(os.environ.get('SURVEY_STATS_INTERVAL', '300'))
+SURVEY_STATS_DEBOUNCE = float(os.environ.get('SURVEY_STATS_DEBOUNCE', '5'))
+GLOBAL_STATS_ID = "global"
+
+survey_stats_changed = asyncio.Event()
+dirty_villages = set()
+
+# Live community stats push (SSE)
+LIVE_STATS_COALESCE_INTERVAL = float(os.environ.get('LIVE_STATS_COALESCE_INTERVAL', '1'))
+LIVE_STATS_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_STATS_MAX_SUBSCRIBERS', '1000'))
+LIVE_STATS_HEARTBEAT = float(os.environ.get('LIVE_STATS_HEARTBEAT', '15'))
+# Follow the counter store's change stream (needs a replica set) so writes on every worker are seen
+LIVE_STATS_CHANGE_STREAM = os.environ.get('LIVE_STATS_CHANGE_STREAM', '').lower() in ('1', 'true', 'yes')
+# EventSource cannot send headers, so browsers open the stream with a short-lived,
+# single-use ticket instead of putting the session token in the URL (and access logs)
+LIVE_STATS_TICKET_TTL = float(os.environ.get('LIVE_STATS_TICKET_TTL', '30'))
+LIVE_STATS_TICKET_CACHE_SIZE = int(os.environ.get('LIVE_STATS_TICKET_CACHE_SIZE', '10000'))
+
+stream_ticket_cache = make_cache('stream_ticket', LIVE_STATS_TICKET_CACHE_SIZE, LIVE_STATS_TICKET_TTL)
+
+# Emergent Auth client setup
+EMERGENT_AUTH_URL = os.environ.get(
+    'EMERGENT_AUTH_URL',
+    'https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data'
+)
+EMERGENT_AUTH_CONNECT_TIMEOUT = float(os.environ.get('EMERGENT_AUTH_CONNECT_TIMEOUT', '3'))
+EMERGENT_AUTH_READ_TIMEOUT = float(os.environ.get('EMERGENT_AUTH_READ_TIMEOUT', '10'))
+EMERGENT_AUTH_MAX_CONNECTIONS = int(os.environ.get('EMERGENT_AUTH_MAX_CONNECTIONS', '20'))
+EMERGENT_AUTH_MAX_CONCURRENCY = int(os.environ.get('EMERGENT_AUTH_MAX_CONCURRENCY', '20'))
+EMERGENT_AUTH_RETRIES = int(os.environ.get('EMERGENT_AUTH_RETRIES', '2'))
+EMERGENT_AUTH_BACKOFF = float(os.environ.get('EMERGENT_AUTH_BACKOFF', '0.2'))
+
+auth_http_client = None
+auth_request_slots = asyncio.Semaphore(EMERGENT_AUTH_MAX_CONCURRENCY)
+
+def create_auth_http_client():
+    """Create the pooled keep-alive client used for Emergent Auth calls"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(EMERGENT_AUTH_READ_TIMEOUT, connect=EMERGENT_AUTH_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=EMERGENT_AUTH_MAX_CONNECTIONS,
+            max_keepalive_connections=EMERGENT_AUTH_MAX_CONNECTIONS
+        )
+    )
+
+async def fetch_auth_session_data(session_id, http_client=None):
+    """Fetch OAuth session data from Emergent Auth, retrying transient failures with backoff"""
+    http_client = http_client or auth_http_client
+    for attempt in range(EMERGENT_AUTH_RETRIES + 1):
+        # A slot is held per attempt only, so backoff sleeps don't starve other logins
+        async with auth_request_slots:
+            started = time.perf_counter()
+            try:
+                response = await http_client.get(EMERGENT_AUTH_URL, headers={"X-Session-ID": session_id})
+                metrics.observe_auth_call(time.perf_counter() - started, str(response.status_code))
+                if response.status_code < 500 or attempt == EMERGENT_AUTH_RETRIES:
+                    return response
+            except httpx.TransportError:
+                metrics.observe_auth_call(time.perf_counter() - started, "transport_error")
+                if attempt == EMERGENT_AUTH_RETRIES:
+                    raise
+        delay = EMERGENT_AUTH_BACKOFF * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay))
 
 # Pydantic models
 class User(BaseModel):
@@ -85,48 +446,171 @@ class SurveyResponse(BaseModel):
     healthcare_affordability: str
     additional_comments: str
 
-def get_current_user(x_session_id: str = Header(alias="X-Session-ID")):
+# Partial update: every SurveyResponse field optional, unknown fields rejected
+SurveyPatch = create_model(
+    "SurveyPatch",
+    __config__=ConfigDict(extra="forbid"),
+    **{name: (Optional[field.annotation], None) for name, field in SurveyResponse.model_fields.items()}
+)
+
+class BulkSurveyRecord(SurveyResponse):
+    # Client-generated id; anything but a non-empty string gets a server-generated one
+    id: Any = None
+
+class SubmitResult(BaseModel):
+    message: str
+    survey_id: str
+    changed_fields: List[str]
+
+class StoredSurvey(SurveyResponse):
+    id: str
+    user_id: Optional[str] = None
+    collected_by: Optional[str] = None
+    submitted_at: datetime
+    content_hash: Optional[str] = None
+
+class MySurveyResult(BaseModel):
+    survey: Optional[StoredSurvey]
+
+SURVEY_BODY_SCHEMA = {
+    "requestBody": {"required": True, "content": {"application/json": {"schema": SurveyResponse.model_json_schema()}}}
+}
+
+async def survey_from_body(request: Request) -> SurveyResponse:
+    """Validate the raw request body straight into SurveyResponse (no intermediate dict)"""
+    try:
+        return SurveyResponse.model_validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in exc.errors()])
+
+async def get_current_user(x_session_id: str = Header(alias="X-Session-ID")):
     """Get current user from session token"""
     if not x_session_id:
         raise HTTPException(status_code=401, detail="No session ID provided")
     
-    session = sessions_collection.find_one({"session_token": x_session_id})
+    if SESSION_TOKEN_MODE == 'jwt' and session_tokens.looks_like_jwt(x_session_id):
+        claims = verify_signed_session(x_session_id)
+        if await revocation_list.is_revoked(claims['jti']):
+            raise HTTPException(status_code=401, detail="Session revoked")
+        return session_tokens.user_from_claims(claims)
+    
+    cached = await session_cache.get(x_session_id)
+    if cached is not None:
+        user, expires_at = cached
+        if datetime.utcnow() <= expires_at:
+            return user
+        await invalidate_session(x_session_id)
+        raise HTTPException(status_code=401, detail="Session expired")
+    
+    session = await sessions_collection.find_one({"session_token": x_session_id})
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    if datetime.now() > session['expires_at']:
-        sessions_collection.delete_one({"session_token": x_session_id})
+    if datetime.utcnow() > session['expires_at']:
+        await invalidate_session(x_session_id)
         raise HTTPException(status_code=401, detail="Session expired")
     
-    user = users_collection.find_one({"id": session['user_id']})
+    user = await users_collection.find_one({"id": session['user_id']})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
+    await session_cache.set(
+        x_session_id,
+        (user, session['expires_at']),
+        ttl=(session['expires_at'] - datetime.utcnow()).total_seconds()
+    )
     return user
 
+def verify_signed_session(token):
+    """Claims of a signed session token, checked against the secret and expiry"""
+    try:
+        return session_tokens.decode_token(token, SESSION_JWT_SECRET, SESSION_JWT_ALGORITHM)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Session expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid session")
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """Restrict an endpoint to accounts listed in ADMIN_EMAILS"""
+    if (current_user.get('email') or '').lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+async def get_metrics_reader(
+    authorization: Optional[str] = Header(None),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+):
+    """Allow a scraper presenting METRICS_TOKEN as a bearer token, or an admin session"""
+    if METRICS_TOKEN and authorization and secrets.compare_digest(
+        authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        return None
+    if not x_session_id:
+        raise HTTPException(status_code=401, detail="Metrics require METRICS_TOKEN or an admin session")
+    return await get_admin_user(await get_current_user(x_session_id))
+
+async def invalidate_session(session_token):
+    """Delete a session and drop it from the session cache"""
+    await session_cache.delete(session_token)
+    await sessions_collection.delete_one({"session_token": session_token})
+
 @app.get("/api/")
 async def root():
     return {"message": "Community Service Project API"}
 
+@app.get("/api/cache/stats")
+async def cache_stats(current_user: dict = Depends(get_admin_user)):
+    """Hit/miss counters for the session, analytics and replay caches"""
+    return {
+        "session_cache": await session_cache.stats(),
+        "segment_cache": await segment_cache.stats(),
+        "segment_stamp_cache": await segment_stamp_cache.stats(),
+        "survey_version_cache": await survey_version_cache.stats(),
+        "idempotency_cache": await idempotency_cache.stats(),
+        "analytics_response_cache": await analytics_response_cache.stats(),
+        "revocation_list": revocation_list.stats()
+    }
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint(reader: Optional[dict] = Depends(get_metrics_reader)):
+    """Prometheus text exposition of request, MongoDB, auth-call and cache metrics"""
+    caches = {
+        "session": session_cache,
+        "segment": segment_cache,
+        "segment_stamp": segment_stamp_cache,
+        "survey_version": survey_version_cache,
+        "idempotency": idempotency_cache,
+        "analytics_response": analytics_response_cache
+    }
+    cache_stats = {name: await cache.stats() for name, cache in caches.items()}
+    gauges = [
+        ("cache_hits", "Cache hits since start", {(("cache", name),): stats["hits"] for name, stats in cache_stats.items()}),
+        ("cache_misses", "Cache misses since start", {(("cache", name),): stats["misses"] for name, stats in cache_stats.items()}),
+        ("cache_entries", "Entries currently cached", {(("cache", name),): stats["size"] or 0 for name, stats in cache_stats.items()}),
+        ("live_stats_subscribers", "Connected analytics stream subscribers", {(): live_stats.stats()["subscribers"]}),
+    ]
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/auth/profile")
 async def auth_profile(x_session_id: str = Header(alias="X-Session-ID")):
     """Authenticate user with Emergent Auth"""
     try:
         # Call Emergent Auth API
-        headers = {"X-Session-ID": x_session_id}
-        response = requests.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers=headers
-        )
+        response = await fetch_auth_session_data(x_session_id)
         
         if response.status_code != 200:
             raise HTTPException(status_code=401, detail="Invalid session")
         
-        user_data = response.json()
+        try:
+            user_data = response.json()
+        except ValueError:
+            raise HTTPException(status_code=401, detail="Authentication failed")
+        if not isinstance(user_data, dict):
+            raise HTTPException(status_code=401, detail="Authentication failed")
         user_id = user_data.get('id')
         
         # Check if user exists
-        existing_user = users_collection.find_one({"email": user_data.get('email')})
+        existing_user = await users_collection.find_one({"email": user_data.get('email')})
         if not existing_user:
             # Create new user
             user_doc = {
@@ -135,81 +619,1137 @@ async def auth_profile(x_session_id: str = Header(alias="X-Session-ID")):
                 "name": user_data.get('name'),
                 "picture": user_data.get('picture')
             }
-            users_collection.insert_one(user_doc)
+            try:
+                await users_collection.insert_one(user_doc)
+            except DuplicateKeyError:
+                # A concurrent login created the user first
+                pass
         
-        # Create session
-        session_token = str(uuid.uuid4())
-        session_doc = {
-            "session_token": session_token,
-            "user_id": user_id,
-            "expires_at": datetime.now() + timedelta(days=7)
+        user = {
+            "id": user_id,
+            "email": user_data.get('email'),
+            "name": user_data.get('name'),
+            "picture": user_data.get('picture')
         }
-        sessions_collection.insert_one(session_doc)
         
-        return {
-            "user": {
-                "id": user_id,
-                "email": user_data.get('email'),
-                "name": user_data.get('name'),
-                "picture": user_data.get('picture')
-            },
-            "session_token": session_token
-        }
+        # Create session
+        if SESSION_TOKEN_MODE == 'jwt':
+            session_token = session_tokens.issue_token(user, SESSION_JWT_SECRET, SESSION_LIFETIME, SESSION_JWT_ALGORITHM)
+        else:
+            session_token = str(uuid.uuid4())
+            session_doc = {
+                "session_token": session_token,
+                "user_id": user_id,
+                "expires_at": datetime.utcnow() + SESSION_LIFETIME
+            }
+            await sessions_collection.insert_one(session_doc)
+        
+        return {"user": user, "session_token": session_token}
     
-    except requests.RequestException:
+    except httpx.HTTPError:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-@app.post("/api/survey/submit")
-async def submit_survey(survey: SurveyResponse, current_user: dict = Depends(get_current_user)):
+@app.post("/api/auth/logout")
+async def logout(x_session_id: str = Header(alias="X-Session-ID")):
+    """End a session: revoke a signed token, or delete an opaque one"""
+    if SESSION_TOKEN_MODE == 'jwt' and session_tokens.looks_like_jwt(x_session_id):
+        try:
+            claims = session_tokens.decode_token(x_session_id, SESSION_JWT_SECRET, SESSION_JWT_ALGORITHM)
+        except jwt.InvalidTokenError:
+            # Expired or forged tokens are rejected anyway
+            return {"message": "Logged out"}
+        await revocation_list.revoke(claims['jti'], datetime.utcfromtimestamp(claims['exp']))
+    else:
+        await invalidate_session(x_session_id)
+    return {"message": "Logged out"}
+
+@app.post("/api/survey/submit", response_model=SubmitResult, openapi_extra=SURVEY_BODY_SCHEMA)
+async def submit_survey(
+    survey: SurveyResponse = Depends(survey_from_body),
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """Submit survey response"""
-    survey_doc = {
-        "id": str(uuid.uuid4()),
-        "user_id": current_user['id'],
-        "submitted_at": datetime.now(),
-        **survey.dict()
+    answers = survey.model_dump()
+    content_hash = survey_content_hash(answers)
+    
+    # Retried request: replay the recorded response without touching Mongo
+    if idempotency_key:
+        replay = await idempotency_cache.get((current_user['id'], idempotency_key))
+        if replay is not None:
+            if replay[0] != content_hash:
+                raise HTTPException(status_code=409, detail="Idempotency-Key was already used with a different survey")
+            return json_response(replay[1])
+    
+    response = await store_user_survey(current_user['id'], answers, content_hash)
+    
+    if idempotency_key:
+        await idempotency_cache.set((current_user['id'], idempotency_key), (content_hash, response))
+    return json_response(response)
+
+@app.post("/api/survey/bulk")
+async def bulk_submit_surveys(request: Request, current_user: dict = Depends(get_current_user)):
+    """Ingest a batch of surveys collected offline (NDJSON or a JSON array)
+
+    Each record is a SurveyResponse with an optional client-generated "id"; resending
+    a record with the same id replaces it instead of creating a duplicate. The summary
+    counts every record; per-record results stop after SURVEY_BULK_MAX_RESULTS. Either
+    format may be sent with Content-Encoding: gzip or deflate.
+    """
+    writer = BulkSurveyWriter(current_user['id'])
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        index = 0
+        async for line in iter_body_lines(request, SURVEY_BULK_MAX_LINE_BYTES):
+            if line.strip():
+                await writer.add(index, line)
+                index += 1
+    else:
+        records = await read_json_body(request, SURVEY_BULK_MAX_BYTES)
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        for index, record in enumerate(records):
+            await writer.add(index, record)
+    await writer.flush()
+    
+    return {
+        "summary": writer.summary(),
+        "results": sorted(writer.results, key=lambda result: result['index']),
+        "results_truncated": writer.received > len(writer.results)
     }
+
+@app.post("/api/survey/sync")
+async def sync_survey_queue(request: Request, current_user: dict = Depends(get_current_user)):
+    """Acknowledge a batch of submissions queued offline by the client
+
+    The body is {"submissions": [{"client_id": ..., "survey": {...}}, ...]} in queue order,
+    optionally sent with Content-Encoding: gzip. A user has one survey, so only the newest
+    valid submission is written; every client_id is acknowledged as applied, superseded
+    (a later queued submission replaced it), duplicate (acknowledged by an earlier sync)
+    or invalid.
+    """
+    batch = await read_json_body(request, SURVEY_SYNC_MAX_BYTES)
+    submissions = batch.get("submissions") if isinstance(batch, dict) else None
+    if not isinstance(submissions, list):
+        raise HTTPException(status_code=400, detail='Body must be {"submissions": [...]}')
+    if len(submissions) > SURVEY_SYNC_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {SURVEY_SYNC_MAX_ITEMS} submissions per batch")
     
-    # Update existing survey or create new one
-    surveys_collection.replace_one(
-        {"user_id": current_user['id']}, 
-        survey_doc, 
-        upsert=True
-    )
+    acknowledged, accepted = [], []
+    for item in submissions:
+        client_id = item.get("client_id") if isinstance(item, dict) else None
+        if not isinstance(client_id, str) or not client_id:
+            acknowledged.append({"client_id": None, "status": "invalid", "errors": ["client_id is required"]})
+            continue
+        replay = await idempotency_cache.get((current_user['id'], client_id))
+        if replay is not None:
+            acknowledged.append({"client_id": client_id, "status": "duplicate", "survey_id": replay[1]['survey_id']})
+            continue
+        try:
+            survey = SurveyResponse.model_validate(item.get("survey"))
+        except ValidationError as exc:
+            acknowledged.append({"client_id": client_id, "status": "invalid", "errors": validation_messages(exc)})
+            continue
+        ack = {"client_id": client_id, "status": "superseded"}
+        acknowledged.append(ack)
+        answers = survey.model_dump()
+        accepted.append((ack, survey_content_hash(answers), answers))
     
-    return {"message": "Survey submitted successfully", "survey_id": survey_doc['id']}
+    response = {"survey_id": None, "changed_fields": []}
+    if accepted:
+        latest_ack, content_hash, answers = accepted[-1]
+        response = await store_user_survey(current_user['id'], answers, content_hash)
+        latest_ack["status"] = "applied"
+        # Retried batches (lost response) are acknowledged as duplicates without rewriting
+        for ack, item_hash, _ in accepted:
+            ack["survey_id"] = response['survey_id']
+            await idempotency_cache.set((current_user['id'], ack['client_id']), (item_hash, response))
+    
+    return json_response({
+        "acknowledged": acknowledged,
+        "survey_id": response['survey_id'],
+        "changed_fields": response['changed_fields']
+    })
+
+@app.get("/api/survey/export")
+async def export_surveys(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    current_user: dict = Depends(get_admin_user)
+):
+    """Stream every survey as CSV or NDJSON straight from a database cursor"""
+    cursor = decode_surveys(surveys_collection.find({}, EXPORT_PROJECTION, batch_size=EXPORT_BATCH_SIZE))
+    chunks = export_csv_chunks(cursor) if format == "csv" else export_ndjson_chunks(cursor)
+    headers = {"Content-Disposition": f'attachment; filename="surveys.{format}"'}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@app.get("/api/survey/suggestions/report")
+async def get_suggestion_report(
+    village_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """Community-wide count of surveys triggering each suggestion"""
+    segment = survey_segment(village_name, date_from, date_to, age_min, age_max)
+    report = await suggestion_report(segment_match(segment))
+    if segment:
+        report["segment"] = {"filters": segment}
+    return report
 
-@app.get("/api/survey/my-response")
-async def get_my_survey(current_user: dict = Depends(get_current_user)):
+@app.get("/api/admin/surveys")
+async def list_surveys(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    village_name: Optional[str] = None,
+    date: Optional[str] = None,
+    current_user: dict = Depends(get_admin_user)
+):
+    """Page through surveys, newest first, with keyset pagination on (submitted_at, id)"""
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in EXPORT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        requested = LISTING_DEFAULT_FIELDS
+    projection = {"_id": 0, "id": 1, "submitted_at": 1, **{field: 1 for field in requested}}
+    
+    query = {}
+    if village_name is not None:
+        query["village_name"] = village_name
+    if date is not None:
+        query["date"] = date
+    if cursor:
+        submitted_at, survey_id = decode_listing_cursor(cursor)
+        query["$or"] = [
+            {"submitted_at": {"$lt": submitted_at}},
+            {"submitted_at": submitted_at, "id": {"$lt": survey_id}}
+        ]
+    
+    surveys = [
+        await survey_codec.decode(survey)
+        for survey in await surveys_collection.find(query, projection).sort(LISTING_SORT).limit(limit + 1).to_list(length=limit + 1)
+    ]
+    next_cursor = None
+    if len(surveys) > limit:
+        surveys = surveys[:limit]
+        next_cursor = encode_listing_cursor(surveys[-1])
+    return {"surveys": surveys, "next_cursor": next_cursor}
+
+@app.get("/api/survey/my-response", response_model=MySurveyResult)
+async def get_my_survey(
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
     """Get user's survey response"""
-    survey = surveys_collection.find_one({"user_id": current_user['id']})
+    version = await survey_version_cache.get(current_user['id'])
+    if version is not None and etag_matches(if_none_match, make_etag("survey", version)):
+        return not_modified(make_etag("survey", version))
+    
+    survey = await survey_codec.decode(await surveys_collection.find_one({"user_id": current_user['id']}, {"_id": 0}))
     if not survey:
-        return {"survey": None}
+        return json_response({"survey": None})
     
-    # Remove MongoDB _id field
-    survey.pop('_id', None)
-    return {"survey": survey}
+    version = survey_version(survey)
+    await survey_version_cache.set(current_user['id'], version)
+    etag = make_etag("survey", version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return cached_json_response(render_json({"survey": survey}), etag)
+
+@app.patch("/api/survey/my-response")
+async def patch_my_survey(patch: SurveyPatch, current_user: dict = Depends(get_current_user)):
+    """Update individual answers of the user's survey with a $set"""
+    changes = patch.model_dump(exclude_unset=True)
+    null_fields = [field for field, value in changes.items() if value is None]
+    if null_fields:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be null: {', '.join(null_fields)}")
+    
+    stored = await survey_codec.decode(await surveys_collection.find_one({"user_id": current_user['id']}))
+    if not stored:
+        raise HTTPException(status_code=404, detail="No survey found")
+    
+    changed = {field: value for field, value in changes.items() if stored.get(field) != value}
+    if not changed:
+        return {"message": "Survey unchanged", "survey_id": stored['id'], "changes": {}}
+    
+    answers = {field: stored.get(field) for field in SurveyResponse.model_fields}
+    answers.update(changed)
+    update = {**changed, "content_hash": survey_content_hash(answers), "submitted_at": datetime.now()}
+    # Guard on the hash read above so a concurrent edit is not silently overwritten
+    result = await surveys_collection.update_one(
+        {"_id": stored['_id'], "content_hash": stored.get('content_hash')},
+        {"$set": await encode_survey(update)}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Survey was modified concurrently, please retry")
+    
+    updated_survey = {**stored, **update}
+    await apply_survey_changes([(stored, updated_survey)])
+    await survey_version_cache.set(current_user['id'], survey_version(updated_survey))
+    
+    return {
+        "message": "Survey updated successfully",
+        "survey_id": stored['id'],
+        "changes": {field: {"old": stored.get(field), "new": value} for field, value in changed.items()}
+    }
 
 @app.get("/api/survey/analytics")
-async def get_analytics(current_user: dict = Depends(get_current_user)):
-    """Get survey analytics and suggestions"""
-    user_survey = surveys_collection.find_one({"user_id": current_user['id']})
+async def get_analytics(
+    village_name: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="Inclusive YYYY-MM-DD lower bound on survey date"),
+    date_to: Optional[str] = Query(None, description="Inclusive YYYY-MM-DD upper bound on survey date"),
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get survey analytics and suggestions, optionally for a village/date/age segment"""
+    segment = survey_segment(village_name, date_from, date_to, age_min, age_max)
+    community_version = await get_community_version()
+    
+    # Unchanged survey and community: answer from the ETag or the response cache
+    version = await survey_version_cache.get(current_user['id'])
+    if version is not None:
+        etag = analytics_etag(version, community_version, segment)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        cached_body = await analytics_response_cache.get(etag)
+        if cached_body is not None:
+            return cached_json_response(cached_body, etag)
+    
+    user_survey = await survey_codec.decode(
+        await surveys_collection.find_one({"user_id": current_user['id']}, ANALYTICS_SURVEY_PROJECTION)
+    )
     if not user_survey:
         raise HTTPException(status_code=404, detail="No survey found")
+    version = survey_version(user_survey)
+    await survey_version_cache.set(current_user['id'], version)
+    etag = analytics_etag(version, community_version, segment)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
     # Get community aggregates
-    all_surveys = list(surveys_collection.find({}))
+    if segment:
+        field_counts, total_responses = await load_segment_counts(segment)
+    else:
+        field_counts, total_responses = await load_survey_counters()
     
     # Calculate analytics
-    analytics = calculate_analytics(user_survey, all_surveys)
+    analytics = calculate_analytics(user_survey, field_counts, total_responses)
     suggestions = generate_suggestions(user_survey)
     
-    return {
+    response = {
         "user_responses": analytics["user_responses"],
         "community_stats": analytics["community_stats"],
         "suggestions": suggestions
     }
+    if segment:
+        response["segment"] = {"filters": segment, "total_responses": total_responses}
+    body = render_json(response)
+    await analytics_response_cache.set(etag, body)
+    return cached_json_response(body, etag)
+
+@app.get("/api/survey/analytics/villages")
+async def get_village_analytics(
+    village_name: List[str] = Query([], description="Villages to return; all villages when omitted"),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Serve materialized per-village and global community stats from survey_stats, by village name"""
+    query = {"scope": "village"}
+    if village_name:
+        query["_id"] = {"$in": [village_stats_id(name) for name in village_name]}
+    if cursor:
+        query["village_name"] = {"$gt": decode_village_cursor(cursor)}
+    snapshots = await stats_collection.find(query).sort("village_name", 1).limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(snapshots) > limit
+    snapshots = snapshots[:limit]
+    global_snapshot = await stats_collection.find_one({"_id": GLOBAL_STATS_ID})
+    
+    now = datetime.utcnow()
+    for snapshot in filter(None, [global_snapshot, *snapshots]):
+        snapshot["staleness_seconds"] = round((now - snapshot["computed_at"]).total_seconds(), 1)
+        snapshot.pop("_id")
+    return {
+        "global": global_snapshot,
+        "villages": snapshots,
+        "has_more": has_more,
+        "next_cursor": encode_village_cursor(snapshots[-1]["village_name"]) if has_more else None
+    }
+
+@app.post("/api/survey/analytics/stream/ticket")
+async def create_stream_ticket(current_user: dict = Depends(get_current_user)):
+    """Single-use ticket for opening the live stats stream from an EventSource"""
+    ticket = secrets.token_urlsafe(32)
+    await stream_ticket_cache.set(ticket, current_user['id'])
+    return {"ticket": ticket, "expires_in": LIVE_STATS_TICKET_TTL}
+
+@app.get("/api/survey/analytics/stream")
+async def stream_analytics(
+    request: Request,
+    ticket: Optional[str] = Query(None, description="From POST /api/survey/analytics/stream/ticket, for EventSource clients"),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+):
+    """Push community stats to the client whenever they change"""
+    if ticket:
+        if await stream_ticket_cache.pop(ticket) is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    else:
+        await get_current_user(x_session_id)
+    
+    # Take the slot before the 200 goes out, so a full hub is always a 503
+    try:
+        queue = live_stats.reserve()
+    except TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Too many live subscribers")
+    
+    async def events():
+        try:
+            async for event in live_stats_events(request, queue):
+                yield event
+        finally:
+            live_stats.release(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also releases the slot when the client disconnects before the body starts
+        background=BackgroundTask(live_stats.release, queue)
+    )
+
+@app.get("/api/survey/analytics/cohort")
+async def get_cohort_analytics(
+    village_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    crosstab: List[str] = Query(
+        ["clean_water_access:toilet_facility"],
+        description="row_field:column_field pairs of SurveyResponse fields"
+    ),
+    current_user: dict = Depends(get_admin_user)
+):
+    """Field distributions, cross-tabs and per-village rollups computed with the vectorized engine"""
+    pairs = []
+    for spec in crosstab:
+        row_field, _, column_field = spec.partition(":")
+        if row_field not in SurveyResponse.model_fields or column_field not in SurveyResponse.model_fields:
+            raise HTTPException(status_code=400, detail=f"Invalid crosstab '{spec}'")
+        pairs.append((row_field, column_field))
+    
+    segment = survey_segment(village_name, date_from, date_to, age_min, age_max)
+    columns = {"village_name", *ANALYTICS_FIELDS, *(field for pair in pairs for field in pair)}
+    surveys = [survey async for survey in decode_surveys(surveys_collection.find(
+        segment_match(segment),
+        {"_id": 0, **{field: 1 for field in columns}},
+        batch_size=EXPORT_BATCH_SIZE
+    ).limit(COHORT_MAX_SURVEYS + 1))]
+    if len(surveys) > COHORT_MAX_SURVEYS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Cohort has more than {COHORT_MAX_SURVEYS} surveys; narrow it with village_name, dates or ages"
+        )
+    # pandas work runs off the event loop
+    report = await asyncio.to_thread(analytics_engine.cohort_report, surveys, ANALYTICS_FIELDS, pairs)
+    if segment:
+        report["segment"] = {"filters": segment}
+    return report
+
+def answer_value(survey, field):
+    """Counted value of an answer; missing and null both count as "Unknown", as in $ifNull"""
+    value = survey.get(field)
+    return "Unknown" if value is None else value
+
+def count_survey_fields(surveys):
+    """Count answers per analytics field over an iterable of surveys"""
+    field_counts = {field: {} for field in ANALYTICS_FIELDS}
+    total_responses = 0
+    for survey in surveys:
+        total_responses += 1
+        for field in ANALYTICS_FIELDS:
+            value = answer_value(survey, field)
+            field_counts[field][value] = field_counts[field].get(value, 0) + 1
+    return field_counts, total_responses
+
+def survey_counter_deltas(changes):
+    """Per (field, value) count changes for a list of (old_survey, new_survey) replacements"""
+    deltas = {}
+    for old_survey, new_survey in changes:
+        for survey, step in ((old_survey, -1), (new_survey, 1)):
+            if survey is None:
+                continue
+            for field in ANALYTICS_FIELDS:
+                key = (field, answer_value(survey, field))
+                deltas[key] = deltas.get(key, 0) + step
+    return {key: delta for key, delta in deltas.items() if delta}
+
+async def update_survey_counters(changes):
+    """Apply survey inserts/replacements to the community counter store; returns the deltas applied"""
+    deltas = survey_counter_deltas(changes)
+    operations = [
+        UpdateOne({"_id": {"field": field, "value": value}}, {"$inc": {"count": delta}}, upsert=True)
+        for (field, value), delta in deltas.items()
+    ]
+    total_delta = sum((new_survey is not None) - (old_survey is not None) for old_survey, new_survey in changes)
+    if total_delta:
+        operations.append(UpdateOne({"_id": TOTAL_COUNTER_ID}, {"$inc": {"count": total_delta}}, upsert=True))
+    operations.append(UpdateOne({"_id": VERSION_COUNTER_ID}, {"$inc": {"version": 1}}, upsert=True))
+    await counters_collection.bulk_write(operations, ordered=False)
+    community_version_cache.clear()
+    return deltas, total_delta
+
+async def load_survey_counters():
+    """Read per-field answer counts and the survey total from the counter store"""
+    field_counts = {field: {} for field in ANALYTICS_FIELDS}
+    total_responses = 0
+    async for counter in counters_collection.find({"count": {"$gt": 0}}):
+        if counter['_id'] == TOTAL_COUNTER_ID:
+            total_responses = counter['count']
+        elif counter['_id']['field'] in field_counts:
+            field_counts[counter['_id']['field']][counter['_id']['value']] = counter['count']
+    return field_counts, total_responses
+
+def survey_counts_pipeline(match=None):
+    """Aggregation pipeline producing one $group histogram per analytics field plus the total"""
+    facets = {
+        field: [{"$group": {"_id": {"$ifNull": [f"${field}", "Unknown"]}, "count": {"$sum": 1}}}]
+        for field in ANALYTICS_FIELDS
+    }
+    facets[TOTAL_COUNTER_ID] = [{"$count": "count"}]
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$facet": facets})
+    return pipeline
+
+async def aggregate_survey_counts(match=None, collection=None):
+    """Count answers per analytics field inside the database; only the counts cross the wire"""
+    collection = surveys_collection if collection is None else collection
+    result = await collection.aggregate(survey_counts_pipeline(match)).next()
+    field_counts = {
+        field: await survey_codec.decode_counts(field, {bucket['_id']: bucket['count'] for bucket in result[field]})
+        for field in ANALYTICS_FIELDS
+    }
+    total = result[TOTAL_COUNTER_ID]
+    return field_counts, total[0]['count'] if total else 0
 
-def calculate_analytics(user_survey, all_surveys):
+async def rebuild_survey_counters():
+    """Recount the counter store from the surveys collection
+
+    Counters are overwritten with upserts, so readers never see an empty store. Returns
+    False without recounting when another worker (or generate_surveys --insert) holds the
+    rebuild lock.
+    """
+    now = datetime.utcnow()
+    # A lock left behind by a crashed rebuild expires
+    await counters_collection.delete_one({"_id": COUNTER_REBUILD_LOCK_ID, "expires_at": {"$lt": now}})
+    try:
+        await counters_collection.insert_one({
+            "_id": COUNTER_REBUILD_LOCK_ID,
+            "expires_at": now + timedelta(seconds=COUNTER_REBUILD_LOCK_TIMEOUT)
+        })
+    except DuplicateKeyError:
+        return False
+    try:
+        for _ in range(COUNTER_REBUILD_ATTEMPTS):
+            version_before = await counters_collection.find_one({"_id": VERSION_COUNTER_ID})
+            field_counts, total_responses = await aggregate_survey_counts()
+            counts = {
+                (field, value): count
+                for field, values in field_counts.items()
+                for value, count in values.items()
+            }
+            operations = [
+                UpdateOne({"_id": {"field": field, "value": value}}, {"$set": {"count": count}}, upsert=True)
+                for (field, value), count in counts.items()
+            ]
+            operations.append(UpdateOne({"_id": TOTAL_COUNTER_ID}, {"$set": {"count": total_responses}}, upsert=True))
+            await counters_collection.bulk_write(operations, ordered=False)
+            await counters_collection.delete_many({"_id": {"$nin": [
+                *({"field": field, "value": value} for field, value in counts),
+                TOTAL_COUNTER_ID, VERSION_COUNTER_ID, COUNTER_REBUILD_LOCK_ID
+            ]}})
+            # A survey written during the recount may have had its $inc overwritten: count again
+            if await counters_collection.find_one({"_id": VERSION_COUNTER_ID}) == version_before:
+                break
+        else:
+            logger.warning("Survey counters rebuilt while surveys kept changing; they may be slightly off")
+    finally:
+        await counters_collection.delete_one({"_id": COUNTER_REBUILD_LOCK_ID})
+    # Bump the version so ETags handed out before the rebuild never match again
+    await counters_collection.update_one({"_id": VERSION_COUNTER_ID}, {"$inc": {"version": 1}}, upsert=True)
+    community_version_cache.clear()
+    return True
+
+async def ensure_survey_counters():
+    """Build the counter store on first start against an existing surveys collection
+
+    When several workers start together one of them rebuilds and the others wait for it.
+    """
+    while await counters_collection.find_one({"_id": TOTAL_COUNTER_ID}) is None:
+        if not await rebuild_survey_counters():
+            await asyncio.sleep(COUNTER_REBUILD_POLL_INTERVAL)
+
+def survey_segment(village_name=None, date_from=None, date_to=None, age_min=None, age_max=None):
+    """Collect the analytics filters that were actually given"""
+    segment = {
+        "village_name": village_name,
+        "date_from": segment_date("date_from", date_from),
+        "date_to": segment_date("date_to", date_to),
+        "age_min": age_min,
+        "age_max": age_max
+    }
+    return {key: value for key, value in segment.items() if value is not None}
+
+def segment_date(name, value):
+    """Normalize a YYYY-MM-DD filter, since survey dates are compared as strings"""
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be a YYYY-MM-DD date")
+
+def segment_match(segment):
+    """Translate a segment into a $match on the indexed survey fields"""
+    match = {}
+    if "village_name" in segment:
+        match["village_name"] = segment["village_name"]
+    date_range = {}
+    if "date_from" in segment:
+        date_range["$gte"] = segment["date_from"]
+    if "date_to" in segment:
+        date_range["$lte"] = segment["date_to"]
+    if date_range:
+        match["date"] = date_range
+    age_range = {}
+    if "age_min" in segment:
+        age_range["$gte"] = segment["age_min"]
+    if "age_max" in segment:
+        age_range["$lte"] = segment["age_max"]
+    if age_range:
+        match["respondent_age"] = age_range
+    return match
+
+def segment_stamp_key(village_name=None):
+    return ("all",) if village_name is None else ("village", village_name)
+
+async def current_segment_stamp(stamp_key):
+    """Token that changes whenever a survey in the village (or, for ("all",), any survey) changes"""
+    stamp = await segment_stamp_cache.get(stamp_key)
+    if stamp is None:
+        stamp = uuid.uuid4().hex
+        await segment_stamp_cache.set(stamp_key, stamp)
+    return stamp
+
+async def load_segment_counts(segment):
+    """Per-field answer counts for one segment, cached until a survey in its village changes"""
+    key = tuple(sorted(segment.items()))
+    stamp = await current_segment_stamp(segment_stamp_key(segment.get("village_name")))
+    cached = await segment_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    # The stamp is read before counting, so a write landing meanwhile retires this entry
+    counts = await aggregate_survey_counts(segment_match(segment))
+    await segment_cache.set(key, (stamp, counts))
+    return counts
+
+async def invalidate_segments(changes):
+    """Retire cached segments of the villages a write touched, and every village-less segment"""
+    villages = {survey.get("village_name") for change in changes for survey in change if survey is not None}
+    for stamp_key in {segment_stamp_key(), *map(segment_stamp_key, villages)}:
+        await segment_stamp_cache.delete(stamp_key)
+
+async def apply_survey_changes(changes):
+    """Propagate (old_survey, new_survey) writes to counters and cached aggregates"""
+    if not changes:
+        return
+    deltas, total_delta = await update_survey_counters(changes)
+    if not LIVE_STATS_CHANGE_STREAM:
+        live_stats.apply_deltas(deltas, total_delta)
+    await invalidate_segments(changes)
+    mark_survey_stats_dirty(changes)
+
+async def watch_survey_counters():
+    """Feed counter-store change events into the live stats hub, resuming after errors"""
+    while True:
+        try:
+            async with counters_collection.watch(full_document="updateLookup") as stream:
+                # The stream is open on entry, so no change can fall between it and the snapshot;
+                # events replayed from before the snapshot carry absolute counts and are harmless
+                live_stats.reset(*await load_survey_counters())
+                await live_stats.consume_change_stream(stream)
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError:
+            logger.exception("Survey counter change stream failed; reconnecting")
+            await asyncio.sleep(LIVE_STATS_COALESCE_INTERVAL)
+
+async def live_stats_events(request, queue):
+    """Server-sent events: one community_stats event per coalesced update, plus heartbeats"""
+    while not await request.is_disconnected():
+        try:
+            payload = await asyncio.wait_for(queue.get(), timeout=LIVE_STATS_HEARTBEAT)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        yield f"event: community_stats\ndata: {payload}\n\n"
+
+def village_stats_id(village_name):
+    return f"village:{village_name}"
+
+def encode_village_cursor(village_name):
+    return base64.urlsafe_b64encode(village_name.encode()).decode()
+
+def decode_village_cursor(cursor):
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def mark_survey_stats_dirty(changes):
+    """Queue the villages touched by a write for the next snapshot refresh"""
+    for change in changes:
+        for survey in change:
+            if survey is not None:
+                dirty_villages.add(survey.get("village_name"))
+    survey_stats_changed.set()
+
+def village_counts_pipeline(match=None):
+    """Answer counts per (village, field, value) and survey totals per village in one $facet"""
+    facets = {
+        field: [{"$group": {
+            "_id": {"village": "$village_name", "value": {"$ifNull": [f"${field}", "Unknown"]}},
+            "count": {"$sum": 1}
+        }}]
+        for field in ANALYTICS_FIELDS
+    }
+    facets[TOTAL_COUNTER_ID] = [{"$group": {"_id": "$village_name", "count": {"$sum": 1}}}]
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$facet": facets})
+    return pipeline
+
+async def aggregate_village_counts(match=None):
+    """{village_name: (field_counts, total_responses)} computed inside the database"""
+    result = await surveys_collection.aggregate(village_counts_pipeline(match)).next()
+    villages = {
+        bucket['_id']: ({field: {} for field in ANALYTICS_FIELDS}, bucket['count'])
+        for bucket in result[TOTAL_COUNTER_ID]
+    }
+    for field in ANALYTICS_FIELDS:
+        for bucket in result[field]:
+            counts = villages[bucket['_id']['village']][0][field]
+            # Plain and encoded documents of one answer land in separate buckets
+            value = await survey_codec.decode_value(field, bucket['_id']['value'])
+            counts[value] = counts.get(value, 0) + bucket['count']
+    return villages
+
+def stats_snapshot(scope, village_name, field_counts, total_responses, computed_at):
+    return {
+        "scope": scope,
+        "village_name": village_name,
+        "total_responses": total_responses,
+        "community_stats": community_stats_from_counts(field_counts, total_responses),
+        "computed_at": computed_at
+    }
+
+async def refresh_survey_stats(villages=None):
+    """Rewrite the global snapshot and the given villages' snapshots (all villages when None)"""
+    computed_at = datetime.utcnow()
+    match = {"village_name": {"$in": list(villages)}} if villages is not None else None
+    village_counts = await aggregate_village_counts(match)
+    field_counts, total_responses = await load_survey_counters()
+    
+    operations = [ReplaceOne(
+        {"_id": GLOBAL_STATS_ID},
+        stats_snapshot("global", None, field_counts, total_responses, computed_at),
+        upsert=True
+    )]
+    for village_name, (counts, total) in village_counts.items():
+        operations.append(ReplaceOne(
+            {"_id": village_stats_id(village_name)},
+            stats_snapshot("village", village_name, counts, total, computed_at),
+            upsert=True
+        ))
+    await stats_collection.bulk_write(operations, ordered=False)
+    
+    # Villages that no longer have any surveys
+    stale = {"scope": "village", "computed_at": {"$lt": computed_at}}
+    if villages is not None:
+        stale["village_name"] = {"$in": [name for name in villages if name not in village_counts]}
+    await stats_collection.delete_many(stale)
+
+async def refresh_survey_stats_loop():
+    """Refresh changed villages shortly after writes and everything every SURVEY_STATS_INTERVAL"""
+    last_full_refresh = None
+    while True:
+        try:
+            try:
+                await asyncio.wait_for(survey_stats_changed.wait(), timeout=SURVEY_STATS_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            # Coalesce bursts of submissions into one refresh
+            await asyncio.sleep(SURVEY_STATS_DEBOUNCE)
+            survey_stats_changed.clear()
+            villages = set(dirty_villages)
+            dirty_villages.clear()
+            now = asyncio.get_running_loop().time()
+            if last_full_refresh is None or now - last_full_refresh >= SURVEY_STATS_INTERVAL:
+                await refresh_survey_stats()
+                last_full_refresh = now
+            elif villages:
+                await refresh_survey_stats(villages)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Survey stats refresh failed")
+            await asyncio.sleep(SURVEY_STATS_DEBOUNCE)
+
+# Export columns: identity/metadata followed by the SurveyResponse schema
+EXPORT_FIELDS = ["id", "user_id", "collected_by", "submitted_at", *SurveyResponse.model_fields]
+EXPORT_PROJECTION = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+
+# Leading characters a spreadsheet would evaluate as a formula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def csv_cell(value):
+    """CSV rendering of an exported value; text that would open as a formula is quoted with '"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+# Admin listing
+LISTING_SORT = [("submitted_at", -1), ("id", -1)]
+LISTING_DEFAULT_FIELDS = ["id", "submitted_at", "village_name", "date", "student_name", "respondent_name"]
+
+def encode_listing_cursor(survey):
+    """Opaque cursor pointing just past the given survey in listing order"""
+    position = json.dumps([survey['submitted_at'].isoformat(), survey['id']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_listing_cursor(cursor):
+    try:
+        submitted_at, survey_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(submitted_at), survey_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def export_csv_chunks(cursor):
+    """Encode one cursor batch of surveys per yielded CSV chunk"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    async for survey in cursor:
+        writer.writerow({field: csv_cell(value) for field, value in survey.items()})
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+async def export_ndjson_chunks(cursor):
+    """Encode one cursor batch of surveys per yielded NDJSON chunk"""
+    lines = []
+    async for survey in cursor:
+        lines.append(orjson.dumps(survey))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+async def gzip_chunks(chunks):
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def encode_survey(survey):
+    """Document to write for a survey (or a $set of answers) in the configured storage mode"""
+    if SURVEY_STORAGE_MODE == "encoded":
+        return await survey_codec.encode(survey)
+    return survey
+
+async def decode_surveys(cursor):
+    """Decode stored surveys as they stream from a cursor"""
+    async for survey in cursor:
+        yield await survey_codec.decode(survey)
+
+def survey_content_hash(answers):
+    """Stable digest of a survey's answers, independent of key order"""
+    return hashlib.sha256(json.dumps(answers, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+async def store_user_survey(user_id, answers, content_hash):
+    """Replace a user's survey unless the stored one has identical answers; returns the submit response
+
+    answers must be a dict owned by the caller: it is completed in place into the stored document.
+    """
+    # Identical resubmission: nothing to write
+    stored = await surveys_collection.find_one(
+        {"user_id": user_id},
+        {"_id": 0, "id": 1, "content_hash": 1}
+    )
+    if stored and stored.get('content_hash') == content_hash:
+        return {
+            "message": "Survey submitted successfully",
+            "survey_id": stored['id'],
+            "changed_fields": []
+        }
+    
+    survey_doc = answers
+    survey_doc.update(id=str(uuid.uuid4()), user_id=user_id, submitted_at=datetime.now(), content_hash=content_hash)
+    
+    # Update existing survey or create new one
+    previous_survey = await surveys_collection.find_one_and_replace(
+        {"user_id": user_id}, 
+        await encode_survey(survey_doc), 
+        upsert=True
+    )
+    previous_survey = await survey_codec.decode(previous_survey)
+    await apply_survey_changes([(previous_survey, survey_doc)])
+    await survey_version_cache.set(user_id, survey_version(survey_doc))
+    return {
+        "message": "Survey submitted successfully",
+        "survey_id": survey_doc['id'],
+        "changed_fields": changed_survey_fields(previous_survey, survey_doc)
+    }
+
+def changed_survey_fields(previous_survey, answers):
+    """SurveyResponse fields whose answer differs from the stored survey (all fields for a new one)"""
+    if previous_survey is None:
+        return list(SurveyResponse.model_fields)
+    return [field for field in SurveyResponse.model_fields if previous_survey.get(field) != answers.get(field)]
+
+def survey_version(survey):
+    """Version token of a stored survey, derived from its id and submission time"""
+    return f"{survey['id']}:{int(survey['submitted_at'].timestamp() * 1000)}"
+
+async def get_community_version():
+    """Global survey write counter, re-read from Mongo at most every COMMUNITY_VERSION_TTL seconds"""
+    version = community_version_cache.get(VERSION_COUNTER_ID)
+    if version is None:
+        counter = await counters_collection.find_one({"_id": VERSION_COUNTER_ID})
+        version = counter['version'] if counter else 0
+        community_version_cache.set(VERSION_COUNTER_ID, version)
+    return version
+
+def make_etag(*parts):
+    return 'W/"' + hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+def analytics_etag(survey_version, community_version, segment):
+    return make_etag("analytics", survey_version, community_version, sorted(segment.items()), SUGGESTION_RULES_DIGEST)
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+def not_modified(etag):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+def json_default(value):
+    """orjson fallback for the read-only containers shared between responses"""
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def render_json(payload):
+    """Serialize a response payload once so the bytes can be cached"""
+    return orjson.dumps(payload, default=json_default)
+
+def json_response(payload, status_code=200):
+    """JSON response that skips FastAPI's jsonable_encoder pass"""
+    return Response(content=render_json(payload), status_code=status_code, media_type="application/json")
+
+def cached_json_response(body, etag):
+    """Pre-rendered JSON response carrying an ETag; browsers revalidate it on every use"""
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
+
+# Largest piece of inflated output produced per step, so a small compressed body cannot
+# inflate into memory before the caller's size check sees it
+BODY_INFLATE_STEP = 64 * 1024
+
+async def iter_decoded_body(request):
+    """Stream a request body, inflating Content-Encoding gzip/deflate in bounded pieces"""
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip", "deflate"):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    if encoding == "identity":
+        async for chunk in request.stream():
+            yield chunk
+        return
+    
+    decompressor = zlib.decompressobj(wbits=31 if encoding == "gzip" else 15)
+    async for chunk in request.stream():
+        while chunk:
+            try:
+                piece = decompressor.decompress(chunk, BODY_INFLATE_STEP)
+            except zlib.error:
+                raise HTTPException(status_code=400, detail=f"Body is not valid {encoding} data")
+            chunk = decompressor.unconsumed_tail
+            yield piece
+    if not decompressor.eof:
+        raise HTTPException(status_code=400, detail="Truncated compressed body")
+
+async def read_json_body(request, max_bytes):
+    """Parse a JSON request body, inflating Content-Encoding gzip/deflate, capped at max_bytes decoded"""
+    body = bytearray()
+    async for chunk in iter_decoded_body(request):
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail="Request body too large")
+    
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be valid JSON")
+
+def validation_messages(exc):
+    """Flatten a pydantic ValidationError into "field: message" strings"""
+    return [
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" if error['loc'] else error['msg']
+        for error in exc.errors()
+    ]
+
+async def iter_body_lines(request, max_line_bytes):
+    """Yield complete lines from a streamed (and possibly compressed) request body"""
+    pending = bytearray()
+    async for chunk in iter_decoded_body(request):
+        # Only the new chunk is searched, so a long line is not re-split on every chunk
+        pieces = chunk.split(b"\n")
+        for position, piece in enumerate(pieces):
+            pending += piece
+            if len(pending) > max_line_bytes:
+                raise HTTPException(status_code=413, detail=f"NDJSON lines are limited to {max_line_bytes} bytes")
+            # The last piece has no newline yet and continues in the next chunk
+            if position < len(pieces) - 1:
+                yield bytes(pending)
+                pending.clear()
+    if pending:
+        yield bytes(pending)
+
+class BulkSurveyWriter:
+    """Validates bulk records one at a time and writes them in unordered chunks"""
+
+    def __init__(self, collected_by):
+        self.collected_by = collected_by
+        self.results = []
+        self.counts = {}
+        self.received = 0
+        self.pending = []
+        self.pending_ids = set()
+
+    async def add(self, index, record):
+        """Validate one raw record (JSON text or decoded dict) and queue it for writing"""
+        if index >= SURVEY_BULK_MAX_RECORDS:
+            self.record({"index": index, "status": "rejected", "errors": ["Batch record limit exceeded"]})
+            return
+        try:
+            if isinstance(record, (bytes, str)):
+                survey = BulkSurveyRecord.model_validate_json(record)
+            elif isinstance(record, dict):
+                survey = BulkSurveyRecord.model_validate(record)
+            else:
+                raise ValueError("Record must be a JSON object")
+        except ValidationError as exc:
+            self.record({"index": index, "status": "invalid", "errors": validation_messages(exc)})
+            return
+        except ValueError as exc:
+            self.record({"index": index, "status": "invalid", "errors": [str(exc)]})
+            return
+
+        record_id = survey.id if isinstance(survey.id, str) and survey.id else str(uuid.uuid4())
+        # A repeated id must see the earlier copy as its previous version
+        if record_id in self.pending_ids:
+            await self.flush()
+        survey_doc = survey.model_dump(exclude={"id"})
+        content_hash = survey_content_hash(survey_doc)
+        survey_doc.update(id=record_id, collected_by=self.collected_by, submitted_at=datetime.now(), content_hash=content_hash)
+        self.pending.append((index, survey_doc))
+        self.pending_ids.add(record_id)
+        if len(self.pending) >= SURVEY_BULK_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        """Write queued records with one unordered bulk_write and record per-record results"""
+        if not self.pending:
+            return
+        pending, self.pending, self.pending_ids = self.pending, [], set()
+        ids = [survey_doc['id'] for _, survey_doc in pending]
+        previous = {
+            survey['id']: await survey_codec.decode(survey)
+            async for survey in surveys_collection.find({"id": {"$in": ids}, "collected_by": self.collected_by})
+        }
+        
+        # Resent records with identical answers are acknowledged without a write
+        to_write = []
+        for index, survey_doc in pending:
+            stored = previous.get(survey_doc['id'])
+            if stored is not None and stored.get('content_hash') == survey_doc['content_hash']:
+                self.record({"index": index, "id": survey_doc['id'], "status": "unchanged"})
+            else:
+                to_write.append((index, survey_doc))
+        if not to_write:
+            return
+        
+        operations = [
+            ReplaceOne({"id": survey_doc['id'], "collected_by": self.collected_by}, await encode_survey(survey_doc), upsert=True)
+            for _, survey_doc in to_write
+        ]
+        try:
+            result = await surveys_collection.bulk_write(operations, ordered=False)
+            upserted, failed = set(result.upserted_ids), {}
+        except BulkWriteError as exc:
+            upserted = {item['index'] for item in exc.details.get('upserted', [])}
+            failed = {error['index']: error['errmsg'] for error in exc.details.get('writeErrors', [])}
+
+        changes = []
+        for position, (index, survey_doc) in enumerate(to_write):
+            if position in failed:
+                self.record({"index": index, "id": survey_doc['id'], "status": "failed", "errors": [failed[position]]})
+                continue
+            self.record({
+                "index": index,
+                "id": survey_doc['id'],
+                "status": "created" if position in upserted else "updated"
+            })
+            changes.append((previous.get(survey_doc['id']), survey_doc))
+        await apply_survey_changes(changes)
+
+    def record(self, result):
+        """Count a per-record result; only the first SURVEY_BULK_MAX_RESULTS are kept in full"""
+        self.received += 1
+        self.counts[result['status']] = self.counts.get(result['status'], 0) + 1
+        if len(self.results) < SURVEY_BULK_MAX_RESULTS:
+            self.results.append(result)
+
+    def summary(self):
+        return {"received": self.received, **self.counts}
+
+def calculate_analytics(user_survey, field_counts, total_responses):
     """Calculate analytics data for charts"""
     
     # User responses for charts
@@ -229,128 +1769,117 @@ def calculate_analytics(user_survey, all_surveys):
         }
     }
     
-    # Community statistics
-    total_responses = len(all_surveys)
-    
-    community_stats = {}
-    if total_responses > 0:
-        # Calculate percentages for key metrics
-        fields = [
-            "doctor_visits", "hand_washing", "medicines_available", 
-            "clean_water_access", "healthcare_affordability"
-        ]
-        
-        for field in fields:
-            field_stats = {}
-            for survey in all_surveys:
-                value = survey.get(field, "Unknown")
-                field_stats[value] = field_stats.get(value, 0) + 1
-            
-            # Convert to percentages
-            for key in field_stats:
-                field_stats[key] = round((field_stats[key] / total_responses) * 100, 1)
-            
-            community_stats[field] = field_stats
-    
     return {
         "user_responses": user_responses,
-        "community_stats": community_stats
+        "community_stats": community_stats_from_counts(field_counts, total_responses)
+    }
+
+def community_stats_from_counts(field_counts, total_responses):
+    """Convert per-field answer counts to percentages for key metrics
+
+    Percentages and rounding are those of the original per-request loop. Answers come
+    out in counter/aggregation order rather than first-seen survey order, so the JSON
+    is equal to the old output as an object, not byte for byte.
+    """
+    community_stats = {}
+    if total_responses > 0:
+        for field in ANALYTICS_FIELDS:
+            community_stats[field] = {
+                value: round((count / total_responses) * 100, 1)
+                for value, count in field_counts.get(field, {}).items()
+            }
+    return community_stats
+
+live_stats = LiveStatsHub(
+    render=community_stats_from_counts,
+    total_key=TOTAL_COUNTER_ID,
+    coalesce_interval=LIVE_STATS_COALESCE_INTERVAL,
+    max_subscribers=LIVE_STATS_MAX_SUBSCRIBERS
+)
+
+SUGGESTION_RULES_PATH = os.environ.get(
+    'SUGGESTION_RULES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'suggestion_rules.json')
+)
+
+def freeze_suggestion(suggestion):
+    """Read-only suggestion payload shared by every response that includes it"""
+    return MappingProxyType({**suggestion, "resources": tuple(suggestion.get("resources", ()))})
+
+def compile_suggestion_rules(path):
+    """Load the rule table and compile it into field -> value -> rule index lookups"""
+    with open(path) as f:
+        table = json.load(f)
+    rules = tuple(
+        (rule["field"], frozenset(rule["values"]), freeze_suggestion(rule["suggestion"]))
+        for rule in table["rules"]
+    )
+    lookup = {}
+    for index, (field, values, _) in enumerate(rules):
+        for value in values:
+            lookup.setdefault(field, {}).setdefault(value, []).append(index)
+    lookup = {
+        field: {value: tuple(indexes) for value, indexes in value_map.items()}
+        for field, value_map in lookup.items()
     }
+    return rules, lookup, freeze_suggestion(table["fallback"])
+
+SUGGESTION_RULES, SUGGESTION_LOOKUP, FALLBACK_SUGGESTION = compile_suggestion_rules(SUGGESTION_RULES_PATH)
+
+# Rule-table changes must also change analytics ETags
+with open(SUGGESTION_RULES_PATH, 'rb') as rules_file:
+    SUGGESTION_RULES_DIGEST = hashlib.sha1(rules_file.read()).hexdigest()[:12]
+
+# Stored-survey fields the analytics endpoint reads: chart answers, rule fields and the version
+ANALYTICS_SURVEY_PROJECTION = {
+    "_id": 0, "id": 1, "submitted_at": 1,
+    **{field: 1 for field in (*CATEGORICAL_FIELDS, *SUGGESTION_LOOKUP)}
+}
 
 def generate_suggestions(survey):
     """Generate personalized suggestions based on survey responses"""
-    suggestions = []
-    
-    # Health access suggestions
-    if survey.get("medicines_available") == "No":
-        suggestions.append({
-            "category": "Healthcare Access",
-            "title": "Medicine Availability",
-            "suggestion": "Contact local Primary Health Center (PHC) or Community Health Center (CHC). Consider setting up a community pharmacy or medical kit.",
-            "resources": [
-                "National Health Mission helpline: 104",
-                "Jan Aushadhi stores for affordable medicines",
-                "Local ASHA worker contact"
-            ]
-        })
-    
-    if survey.get("healthcare_affordability") == "No":
-        suggestions.append({
-            "category": "Healthcare Access",
-            "title": "Affordable Healthcare",
-            "suggestion": "Explore government health schemes like Ayushman Bharat, PMJAY, or state-specific health insurance programs.",
-            "resources": [
-                "Ayushman Bharat scheme enrollment",
-                "Local government hospital services",
-                "Health insurance schemes"
-            ]
-        })
-    
-    # Water and sanitation suggestions
-    if survey.get("clean_water_access") in ["No, we rely on alternative sources", "No, access is very limited"]:
-        suggestions.append({
-            "category": "Water & Sanitation",
-            "title": "Clean Water Access",
-            "suggestion": "Contact local water department or panchayat. Consider water purification methods like boiling, filtering, or water purification tablets.",
-            "resources": [
-                "Jal Jeevan Mission for piped water",
-                "Water quality testing kits",
-                "Community water purification systems"
-            ]
-        })
-    
-    if survey.get("toilet_facility") == "Open defecation":
-        suggestions.append({
-            "category": "Sanitation",
-            "title": "Toilet Facility",
-            "suggestion": "Apply for Swachh Bharat Mission toilet construction. Contact local gram panchayat for subsidies and support.",
-            "resources": [
-                "Swachh Bharat Mission portal",
-                "Local panchayat office",
-                "Toilet construction subsidies"
-            ]
-        })
-    
-    # Hygiene practice suggestions
-    if survey.get("hand_washing") in ["Rarely", "Never"]:
-        suggestions.append({
-            "category": "Personal Hygiene",
-            "title": "Hand Washing",
-            "suggestion": "Develop a habit of washing hands before eating and after using toilet. Use soap and clean water for at least 20 seconds.",
-            "resources": [
-                "WHO hand hygiene guidelines",
-                "Local health worker training",
-                "Community hygiene awareness programs"
-            ]
-        })
-    
-    # Waste management suggestions
-    if survey.get("community_waste_system") == "No":
-        suggestions.append({
-            "category": "Waste Management",
-            "title": "Community Waste System",
-            "suggestion": "Organize community meetings to establish waste collection system. Contact local municipal corporation or panchayat.",
-            "resources": [
-                "Swachh Bharat Mission waste management",
-                "Community waste segregation training",
-                "Local waste collection services"
-            ]
-        })
-    
-    # Add general health awareness if no specific issues
-    if len(suggestions) == 0:
-        suggestions.append({
-            "category": "Health Promotion",
-            "title": "Maintain Good Practices",
-            "suggestion": "Continue your good health and hygiene practices. Consider becoming a health advocate in your community.",
-            "resources": [
-                "Community health volunteer programs",
-                "Health awareness campaigns",
-                "Peer education opportunities"
-            ]
-        })
-    
-    return suggestions
+    matched = []
+    for field, value_map in SUGGESTION_LOOKUP.items():
+        matched.extend(value_map.get(survey.get(field), ()))
+    if not matched:
+        return [FALLBACK_SUGGESTION]
+    return [SUGGESTION_RULES[index][2] for index in sorted(matched)]
+
+def suggestion_report_pipeline(match=None):
+    """Count, inside the database, how many surveys trigger each suggestion rule"""
+    facets = {
+        f"rule_{index}": [{"$match": {field: {"$in": survey_codec.match_values(field, values)}}}, {"$count": "count"}]
+        for index, (field, values, _) in enumerate(SUGGESTION_RULES)
+    }
+    facets["fallback"] = [
+        {"$match": {"$nor": [{field: {"$in": survey_codec.match_values(field, values)}} for field, values, _ in SUGGESTION_RULES]}},
+        {"$count": "count"}
+    ]
+    facets[TOTAL_COUNTER_ID] = [{"$count": "count"}]
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$facet": facets})
+    return pipeline
+
+async def suggestion_report(match=None):
+    """Evaluate every suggestion rule across all (or matching) surveys in one aggregation"""
+    # Rule values must match codes assigned by any worker, not only this one
+    await survey_codec.load()
+    result = await surveys_collection.aggregate(suggestion_report_pipeline(match)).next()
+    counts = {key: buckets[0]['count'] if buckets else 0 for key, buckets in result.items()}
+    total_responses = counts[TOTAL_COUNTER_ID]
+    entries = [(suggestion, counts[f"rule_{index}"]) for index, (_, _, suggestion) in enumerate(SUGGESTION_RULES)]
+    entries.append((FALLBACK_SUGGESTION, counts["fallback"]))
+    return {
+        "total_responses": total_responses,
+        "suggestions": [
+            {
+                **suggestion,
+                "surveys": count,
+                "percentage": round((count / total_responses) * 100, 1) if total_responses else 0.0
+            }
+            for suggestion, count in entries
+        ]
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,96 @@
+"""
+Signed stateless session tokens
+
+In "jwt" session mode a login returns an HS256-signed token carrying the user's id,
+email, name and picture, so requests are authenticated by checking the signature and
+expiry locally instead of looking the token up in MongoDB. Logging out revokes the
+token's id (jti) in a revocation collection ({_id: jti, expires_at, revoked_at}, TTL on
+expires_at), so entries disappear once the token would have expired anyway. Each worker
+keeps the list in memory and pulls newly revoked ids at most every refresh_interval
+seconds; a token revoked on another worker is accepted until then.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import asyncio
+import time
+import uuid
+
+import jwt
+
+# Revocations read again on every refresh, to cover clock skew between workers
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def looks_like_jwt(token: str) -> bool:
+    """Signed tokens have three dot-separated parts; opaque session tokens are UUIDs"""
+    return token.count(".") == 2
+
+
+def issue_token(user: dict, secret: str, lifetime: timedelta, algorithm: str = "HS256") -> str:
+    now = datetime.utcnow()
+    claims = {
+        "sub": user["id"],
+        "email": user.get("email"),
+        "name": user.get("name"),
+        "picture": user.get("picture"),
+        "jti": str(uuid.uuid4()),
+        "iat": now,
+        "exp": now + lifetime,
+    }
+    return jwt.encode(claims, secret, algorithm=algorithm)
+
+
+def decode_token(token: str, secret: str, algorithm: str = "HS256") -> dict:
+    """Verified claims; raises jwt.ExpiredSignatureError or jwt.InvalidTokenError"""
+    return jwt.decode(token, secret, algorithms=[algorithm], options={"require": ["sub", "jti", "exp"]})
+
+
+def user_from_claims(claims: dict) -> dict:
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "name": claims.get("name"),
+        "picture": claims.get("picture"),
+    }
+
+
+class RevocationList:
+    def __init__(self, collection, refresh_interval: float = 10.0):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self._revoked: Dict[str, datetime] = {}
+        self._synced_until: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self._refresh_lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        """Pull revocations recorded since the last load (all of them the first time)"""
+        started = datetime.utcnow()
+        query = {}
+        if self._synced_until is not None:
+            query = {"revoked_at": {"$gte": self._synced_until - REFRESH_OVERLAP}}
+        async for entry in self.collection.find(query, {"expires_at": 1}):
+            self._revoked[entry["_id"]] = entry["expires_at"]
+        self._synced_until = started
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        # Expired tokens are rejected by their signature check, so their entries can go
+        self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > started}
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        await self.collection.update_one(
+            {"_id": jti},
+            {"$set": {"expires_at": expires_at, "revoked_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._revoked[jti] = expires_at
+
+    async def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_refresh:
+            async with self._refresh_lock:
+                if time.monotonic() >= self._next_refresh:
+                    await self.load()
+        return jti in self._revoked
+
+    def stats(self) -> dict:
+        return {"revoked": len(self._revoked), "refresh_interval": self.refresh_interval}
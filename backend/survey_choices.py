@@ -0,0 +1,46 @@
+"""
+Options of the survey form's multiple-choice questions (frontend App.js), in form order
+
+This closed set is what encoded storage mode dictionary-encodes; any other answer is
+stored as plain text. The numbers are the relative weights generate_surveys draws each
+option with.
+"""
+
+CHOICE_FIELDS = {
+    "doctor_visits": {
+        "Regularly (once every few months)": 25, "Occasionally (only when needed)": 45,
+        "Rarely (once a year or less)": 22, "Never": 8,
+    },
+    "medicines_available": {"Yes": 70, "No": 30},
+    "vaccinations": {"Yes, regularly": 50, "Sometimes": 25, "Rarely": 15, "No": 10},
+    "hand_washing": {"Always": 45, "Sometimes": 35, "Rarely": 14, "Never": 6},
+    "teeth_brushing": {"Once a day": 50, "Twice a day": 30, "After every meal": 8, "Only when I remember": 12},
+    "hygiene_items": {"Yes": 60, "Sometimes": 25, "No": 15},
+    "travel_hygiene": {
+        "Avoiding touching surfaces unnecessarily": 35, "Using hand sanitizer regularly": 30,
+        "Wearing a mask in crowded areas": 25, "Other": 10,
+    },
+    "clean_water_access": {
+        "Yes, always": 45, "Yes, but occasionally unavailable": 30,
+        "No, we rely on alternative sources": 15, "No, access is very limited": 10,
+    },
+    "toilet_facility": {
+        "Private toilet with proper sanitation": 55, "Shared toilet in the neighborhood": 25,
+        "Open defecation": 15, "Other": 5,
+    },
+    "waste_disposal": {
+        "Through a formal garbage collection service": 35, "Burning waste": 30,
+        "Dumping in open spaces": 28, "Other": 7,
+    },
+    "community_waste_system": {"Yes": 45, "No": 55},
+    "food_cleaning": {"Always": 55, "Occasionally": 30, "Rarely": 11, "Never": 4},
+    "water_purification": {"Boiling": 40, "Filtering": 25, "Using purification tablets": 10, "None": 25},
+    "cooking_hygiene": {
+        "Washing hands before food preparation": 40, "Using clean utensils": 30,
+        "Storing food properly": 22, "Other": 8,
+    },
+    "health_issues_due_hygiene": {"Yes": 40, "No": 60},
+    "surface_disinfection": {"Daily": 30, "Weekly": 35, "Occasionally": 25, "Never": 10},
+    "hygiene_programs_awareness": {"Yes": 35, "No": 65},
+    "healthcare_affordability": {"Yes": 40, "No": 30, "Sometimes": 30},
+}
@@ -0,0 +1,105 @@
+"""
+Dictionary encoding of multiple-choice survey answers
+
+In encoded storage mode each categorical answer is stored as a small integer code
+instead of its full string. Only the options the form offers for a field are encoded;
+any other answer is kept as plain text, so clients cannot grow the code table. Codes
+are assigned per field on first use and recorded in a shared code table
+({_id: {field, value}, field, code}, unique on (field, code)), so every API worker
+agrees on them. Each worker keeps the table in memory and reloads it when it meets a
+code it has not seen yet.
+
+Decoding leaves string answers untouched, so documents written before the mode was
+enabled (or by tools that write plain documents) read back unchanged.
+"""
+
+from typing import Dict, Iterable, List, Optional
+import asyncio
+
+from pymongo.errors import DuplicateKeyError
+
+
+class SurveyCodec:
+    def __init__(self, collection, choices: Dict[str, Iterable[str]]):
+        self.collection = collection
+        self.fields = tuple(choices)
+        self.choices = {field: frozenset(options) for field, options in choices.items()}
+        self._codes: Dict[str, Dict[str, int]] = {field: {} for field in self.fields}
+        self._values: Dict[str, Dict[int, str]] = {field: {} for field in self.fields}
+        self._assign_lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        """(Re)read the whole code table"""
+        async for entry in self.collection.find({}):
+            field, value = entry["_id"]["field"], entry["_id"]["value"]
+            if field in self._codes:
+                self._codes[field][value] = entry["code"]
+                self._values[field][entry["code"]] = value
+
+    async def code_for(self, field: str, value: str) -> Optional[int]:
+        """Code of a form option, assigned on first use; None for any other answer"""
+        code = self._codes[field].get(value)
+        if code is not None:
+            return code
+        if value not in self.choices[field]:
+            return None
+        async with self._assign_lock:
+            while value not in self._codes[field]:
+                code = max(self._values[field], default=-1) + 1
+                try:
+                    await self.collection.insert_one({"_id": {"field": field, "value": value}, "field": field, "code": code})
+                except DuplicateKeyError:
+                    # Another worker assigned this value, or took this code for another one
+                    await self.load()
+                    continue
+                self._codes[field][value] = code
+                self._values[field][code] = value
+        return self._codes[field][value]
+
+    async def encode(self, survey: dict) -> dict:
+        """Copy of a survey document with form options replaced by codes"""
+        encoded = dict(survey)
+        for field in self.fields:
+            value = encoded.get(field)
+            if isinstance(value, str):
+                code = await self.code_for(field, value)
+                if code is not None:
+                    encoded[field] = code
+        return encoded
+
+    async def decode_value(self, field: str, value):
+        if field not in self._values or not isinstance(value, int) or isinstance(value, bool):
+            return value
+        decoded = self._values[field].get(value)
+        if decoded is None:
+            await self.load()
+            decoded = self._values[field].get(value, value)
+        return decoded
+
+    async def decode(self, survey):
+        """Copy of a stored survey with codes replaced by answers (None passes through)"""
+        if survey is None:
+            return None
+        decoded = dict(survey)
+        for field in self.fields:
+            if field in decoded:
+                decoded[field] = await self.decode_value(field, decoded[field])
+        return decoded
+
+    async def decode_counts(self, field: str, counts: Dict) -> Dict:
+        """Merge per-answer counts whose keys may mix codes and plain strings"""
+        merged = {}
+        for value, count in counts.items():
+            value = await self.decode_value(field, value)
+            merged[value] = merged.get(value, 0) + count
+        return merged
+
+    def match_values(self, field: str, values: Iterable[str]) -> List:
+        """Values to $in-match a set of answers in both plain and encoded documents"""
+        values = sorted(values)
+        if field not in self._codes:
+            return values
+        return values + sorted(self._codes[field][value] for value in values if value in self._codes[field])
+
+    def stats(self) -> dict:
+        return {field: len(codes) for field, codes in self._codes.items()}
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the Community Service Project API
+Drives parallel requests at the survey endpoints and reports throughput and latency,
+so a build can be compared before and after a change (e.g. the move to Motor):
+
+  python backend_load_test.py --output before.json
+  ... deploy the change ...
+  python backend_load_test.py --baseline before.json --max-regression 10
+"""
+
+import requests
+import json
+import time
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend URL from environment
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8001/api")
+
+ENDPOINTS = {
+    "root": ("GET", "/"),
+    "my-response": ("GET", "/survey/my-response"),
+    "analytics": ("GET", "/survey/analytics"),
+}
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+def run_endpoint(name, session_id, total_requests, concurrency):
+    """Fire total_requests at one endpoint from `concurrency` threads"""
+    method, path = ENDPOINTS[name]
+    http = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    headers = {"X-Session-ID": session_id} if session_id else {}
+
+    def one_request(_):
+        started = time.perf_counter()
+        try:
+            response = http.request(method, f"{BACKEND_URL}{path}", headers=headers, timeout=30)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for _, latency in results)
+    return {
+        "endpoint": name,
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for ok, _ in results if not ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+def percent_change(before, after):
+    if not before:
+        return None
+    return round((after - before) / before * 100, 1)
+
+def compare_reports(baseline, report):
+    """Per-endpoint deltas of this run against a saved report, for endpoints in both"""
+    previous = {result["endpoint"]: result for result in baseline}
+    comparison = []
+    for result in report:
+        before = previous.get(result["endpoint"])
+        if before is None:
+            continue
+        comparison.append({
+            "endpoint": result["endpoint"],
+            "throughput_rps": percent_change(before["throughput_rps"], result["throughput_rps"]),
+            "p50_ms": percent_change(before["latency_ms"]["p50"], result["latency_ms"]["p50"]),
+            "p95_ms": percent_change(before["latency_ms"]["p95"], result["latency_ms"]["p95"]),
+            "errors": result["errors"] - before["errors"],
+        })
+    return comparison
+
+def is_regression(delta, max_regression):
+    """Throughput down, or p95 latency up, by more than max_regression percent, or new errors"""
+    return (
+        (delta["throughput_rps"] is not None and delta["throughput_rps"] < -max_regression)
+        or (delta["p95_ms"] is not None and delta["p95_ms"] > max_regression)
+        or delta["errors"] > 0
+    )
+
+def signed(value):
+    return "n/a" if value is None else f"{value:+}%"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--session-id", default=os.environ.get("LOAD_TEST_SESSION_ID"),
+                        help="X-Session-ID of a user that has already submitted a survey")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--endpoints", default="root,my-response,analytics",
+                        help="Comma separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--output", help="Write the JSON report to this file as well")
+    parser.add_argument("--baseline", help="Report saved by an earlier --output run to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="With --baseline: exit 1 if throughput drops or p95 rises by more than this percent")
+    args = parser.parse_args()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"🚀 Load testing {BACKEND_URL} ({args.requests} requests, concurrency {args.concurrency})")
+    report = []
+    for name in args.endpoints.split(","):
+        if name in ("my-response", "analytics") and not args.session_id:
+            print(f"⏭️  {name}: skipped, no session id")
+            continue
+        result = run_endpoint(name, args.session_id, args.requests, args.concurrency)
+        report.append(result)
+        print(f"{'✅' if not result['errors'] else '❌'} {name}: {result['throughput_rps']} req/s, "
+              f"p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+              f"{result['errors']} errors")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if baseline is not None:
+        comparison = compare_reports(baseline, report)
+        regressed = False
+        print(f"\n📊 Compared with {args.baseline}")
+        for delta in comparison:
+            failed = args.max_regression is not None and is_regression(delta, args.max_regression)
+            regressed = regressed or failed
+            print(f"{'❌' if failed else '✅'} {delta['endpoint']}: throughput {signed(delta['throughput_rps'])}, "
+                  f"p50 {signed(delta['p50_ms'])}, p95 {signed(delta['p95_ms'])}, errors {delta['errors']:+}")
+        if regressed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
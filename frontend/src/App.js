@@ -1,7 +1,8 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Chart as ChartJS, CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend, ArcElement } from 'chart.js';
 import { Bar, Pie } from 'react-chartjs-2';
 import './App.css';
+import { saveDraft, loadDraft, clearDraft, enqueueSubmission, flushQueue, isRejected, pendingCount, removeSubmission, startBackgroundSync } from './offlineQueue';
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend, ArcElement);
 
@@ -13,6 +14,9 @@ function App() {
   const [userSurvey, setUserSurvey] = useState(null);
   const [analytics, setAnalytics] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [pendingSync, setPendingSync] = useState(0);
+  const syncRef = useRef(null);
+  const userId = user ? user.id : null;
 
   const backendUrl = process.env.REACT_APP_BACKEND_URL || 'https://72251f16-e2c3-4ee3-a557-2296c4630168.preview.emergentagent.com';
 
@@ -34,6 +38,49 @@ function App() {
     }
   }, []);
 
+  // Restore the logged-in user's unfinished survey draft
+  useEffect(() => {
+    if (!userId) return;
+    let cancelled = false;
+    loadDraft(userId)
+      .then(draft => {
+        if (draft && !cancelled) setSurveyData(draft);
+      })
+      .catch(error => console.error('Error loading draft:', error));
+    return () => {
+      cancelled = true;
+    };
+  }, [userId]);
+
+  // Persist the draft shortly after the user stops typing
+  useEffect(() => {
+    if (!userId || !Object.keys(surveyData).length) return;
+    const timer = setTimeout(() => {
+      saveDraft(surveyData, userId).catch(error => console.error('Error saving draft:', error));
+    }, 500);
+    return () => clearTimeout(timer);
+  }, [surveyData, userId]);
+
+  // Flush this user's queued offline submissions in the background while logged in
+  useEffect(() => {
+    if (!sessionToken || !userId) return;
+    pendingCount(userId).then(setPendingSync).catch(() => {});
+    const sync = startBackgroundSync({
+      backendUrl,
+      getSessionToken: () => sessionToken,
+      userId,
+      onSynced: () => {
+        pendingCount(userId).then(setPendingSync).catch(() => {});
+        fetchUserSurvey(sessionToken);
+      }
+    });
+    syncRef.current = sync;
+    return () => {
+      sync.stop();
+      syncRef.current = null;
+    };
+  }, [sessionToken, userId]);
+
   const handleAuthCallback = async (sessionId) => {
     try {
       const response = await fetch(`${backendUrl}/api/auth/profile`, {
@@ -95,11 +142,20 @@ function App() {
   };
 
   const handleLogout = () => {
+    if (sessionToken) {
+      // Best effort: the token is dropped locally even if the server cannot be reached
+      fetch(`${backendUrl}/api/auth/logout`, {
+        method: 'POST',
+        headers: { 'X-Session-ID': sessionToken }
+      }).catch(error => console.error('Logout request failed:', error));
+    }
     localStorage.removeItem('user');
     localStorage.removeItem('sessionToken');
     setUser(null);
     setSessionToken(null);
     setCurrentPage('login');
+    // The draft stays stored under this user only; the next user starts from a blank form
+    setSurveyData({});
     setUserSurvey(null);
     setAnalytics(null);
   };
@@ -108,25 +164,49 @@ function App() {
     e.preventDefault();
     setLoading(true);
 
+    let clientId;
     try {
-      const response = await fetch(`${backendUrl}/api/survey/submit`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'X-Session-ID': sessionToken
-        },
-        body: JSON.stringify(surveyData)
-      });
+      // Queue first, so the survey survives a failed request or a closed tab
+      clientId = await enqueueSubmission(surveyData, userId);
+      await clearDraft(userId);
+    } catch (error) {
+      console.error('Error queueing survey:', error);
+      alert('Error saving survey on this device');
+      setLoading(false);
+      return;
+    }
 
-      if (response.ok) {
+    try {
+      const result = await flushQueue({ backendUrl, sessionToken, userId });
+      const invalid = result ? result.acknowledged.filter(ack => ack.status === 'invalid') : [];
+      if (invalid.length) {
+        await saveDraft(surveyData, userId);
+        alert(`Survey could not be submitted:\n${invalid.flatMap(ack => ack.errors).join('\n')}`);
+      } else {
         alert('Survey submitted successfully!');
         fetchUserSurvey(sessionToken);
         setCurrentPage('dashboard');
       }
     } catch (error) {
       console.error('Error submitting survey:', error);
-      alert('Error submitting survey');
+      if (error.status === 401) {
+        // Stays queued for this user and is sent after they log in again
+        alert('Your session has expired. Your survey is saved on this device; please log in again to send it.');
+        handleLogout();
+      } else if (isRejected(error)) {
+        // Resending would be rejected again; the answers go back to the draft instead
+        await removeSubmission(clientId);
+        await saveDraft(surveyData, userId);
+        alert(`The server rejected the survey${typeof error.detail === 'string' ? `: ${error.detail}` : ` (status ${error.status})`}. Your answers are kept as a draft.`);
+      } else {
+        alert(error.status
+          ? 'The server is busy right now. Your survey is saved on this device and will be sent automatically.'
+          : 'Could not reach the server. Your survey is saved on this device and will be sent automatically when the connection returns.');
+        if (syncRef.current) syncRef.current.syncNow();
+        setCurrentPage('dashboard');
+      }
     } finally {
+      if (userId) pendingCount(userId).then(setPendingSync).catch(() => {});
       setLoading(false);
     }
   };
@@ -231,6 +311,7 @@ Generated on: ${new Date().toLocaleDateString()}
                   <h3 className="text-lg font-medium text-gray-900">Survey Status</h3>
                   <p className="text-sm text-gray-500">
                     {userSurvey ? '✅ Completed' : '⏳ Pending'}
+                    {pendingSync > 0 && ` · 📤 ${pendingSync} waiting to sync`}
                   </p>
                 </div>
               </div>
@@ -0,0 +1,200 @@
+// Offline-first survey submissions.
+//
+// Drafts and pending submissions live in IndexedDB, so nothing typed in the field is
+// lost without connectivity. Pending submissions are flushed in one gzip-compressed
+// batch to /api/survey/sync; failed flushes are retried with exponential backoff and
+// jitter, and a reconnect ('online' event) triggers an immediate retry. Each submission
+// records the user who queued it and is only ever sent with that user's session, so a
+// shared device never files one student's survey under another's account. Drafts are
+// kept per user for the same reason: they hold respondents' names and phone numbers.
+
+const DB_NAME = 'health-survey-offline';
+const DB_VERSION = 3;
+const QUEUE_STORE = 'queue';
+const DRAFT_STORE = 'drafts';
+
+const BATCH_SIZE = 50;
+const BACKOFF_BASE_MS = 2000;
+const BACKOFF_MAX_MS = 5 * 60 * 1000;
+
+let dbPromise = null;
+
+const openDatabase = () => {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = (event) => {
+        const db = request.result;
+        if (event.oldVersion < 1) {
+          const queue = db.createObjectStore(QUEUE_STORE, { keyPath: 'client_id' });
+          queue.createIndex('queued_at', 'queued_at');
+          db.createObjectStore(DRAFT_STORE);
+        }
+        if (event.oldVersion < 2) {
+          // Submissions queued before this index existed have no owner and are never sent
+          request.transaction.objectStore(QUEUE_STORE).createIndex('user_queued_at', ['user_id', 'queued_at']);
+        }
+        if (event.oldVersion >= 1 && event.oldVersion < 3) {
+          // The single shared draft has no owner to restore it for
+          request.transaction.objectStore(DRAFT_STORE).clear();
+        }
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => {
+        dbPromise = null;
+        reject(request.error);
+      };
+    });
+  }
+  return dbPromise;
+};
+
+const withStore = async (storeName, mode, action) => {
+  const db = await openDatabase();
+  return new Promise((resolve, reject) => {
+    const transaction = db.transaction(storeName, mode);
+    const result = action(transaction.objectStore(storeName));
+    transaction.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+    transaction.onerror = () => reject(transaction.error);
+    transaction.onabort = () => reject(transaction.error);
+  });
+};
+
+const newClientId = () => (
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`
+);
+
+export const saveDraft = (survey, userId) => withStore(DRAFT_STORE, 'readwrite', store => store.put(survey, userId));
+
+export const loadDraft = (userId) => withStore(DRAFT_STORE, 'readonly', store => store.get(userId));
+
+export const clearDraft = (userId) => withStore(DRAFT_STORE, 'readwrite', store => store.delete(userId));
+
+const userRange = (userId) => IDBKeyRange.bound([userId, -Infinity], [userId, Infinity]);
+
+export const enqueueSubmission = async (survey, userId) => {
+  const item = {
+    client_id: newClientId(),
+    user_id: userId,
+    survey,
+    queued_at: Date.now()
+  };
+  await withStore(QUEUE_STORE, 'readwrite', store => store.put(item));
+  return item.client_id;
+};
+
+export const removeSubmission = (clientId) => withStore(QUEUE_STORE, 'readwrite', store => store.delete(clientId));
+
+export const listQueue = (userId) => withStore(
+  QUEUE_STORE, 'readonly', store => store.index('user_queued_at').getAll(userRange(userId))
+);
+
+export const pendingCount = (userId) => withStore(
+  QUEUE_STORE, 'readonly', store => store.index('user_queued_at').count(userRange(userId))
+);
+
+const compressBody = async (text) => {
+  if (typeof CompressionStream === 'undefined') {
+    return { body: text, headers: {} };
+  }
+  const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+  return { body: await new Response(stream).blob(), headers: { 'Content-Encoding': 'gzip' } };
+};
+
+// Send up to BATCH_SIZE of the user's pending submissions; returns the server response,
+// or null when there was nothing to send. Throws on network errors and non-2xx responses
+// (error.status, plus error.detail when the server gave one).
+export const flushQueue = async ({ backendUrl, sessionToken, userId }) => {
+  const pending = (await listQueue(userId)).slice(0, BATCH_SIZE);
+  if (!pending.length) return null;
+
+  const { body, headers } = await compressBody(JSON.stringify({
+    submissions: pending.map(({ client_id, survey }) => ({ client_id, survey }))
+  }));
+  const response = await fetch(`${backendUrl}/api/survey/sync`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-Session-ID': sessionToken,
+      ...headers
+    },
+    body
+  });
+  if (!response.ok) {
+    const error = new Error(`Sync failed with status ${response.status}`);
+    error.status = response.status;
+    error.detail = await response.json().then(data => data.detail, () => undefined);
+    throw error;
+  }
+
+  // Every acknowledged submission leaves the queue; invalid ones would never be accepted
+  // on retry, so they are only reported back to the caller
+  const result = await response.json();
+  await withStore(QUEUE_STORE, 'readwrite', store => {
+    result.acknowledged.forEach((ack, index) => store.delete(pending[index].client_id));
+  });
+  return result;
+};
+
+// A flush error the server will keep giving for this batch (not auth, timeouts or rate limits)
+export const isRejected = (error) => Boolean(
+  error.status && error.status < 500 && ![401, 408, 429].includes(error.status)
+);
+
+// Keep flushing while submissions are pending. syncNow() wakes the loop (e.g. right
+// after enqueueing), stop() ends it.
+export const startBackgroundSync = ({ backendUrl, getSessionToken, userId, onSynced }) => {
+  let attempt = 0;
+  let timer = null;
+  let stopped = false;
+  let running = false;
+
+  const schedule = (delay) => {
+    clearTimeout(timer);
+    if (!stopped) timer = setTimeout(run, delay);
+  };
+
+  const run = async () => {
+    if (running || stopped) return;
+    const sessionToken = getSessionToken();
+    if (!sessionToken || !navigator.onLine) return;
+    running = true;
+    try {
+      const result = await flushQueue({ backendUrl, sessionToken, userId });
+      attempt = 0;
+      if (result) {
+        if (onSynced) onSynced(result);
+        schedule(0);
+      }
+    } catch (error) {
+      // Client errors other than auth/rate limits will not succeed on retry
+      if (isRejected(error)) {
+        console.error('Offline queue sync rejected:', error);
+        return;
+      }
+      const delay = Math.min(BACKOFF_MAX_MS, BACKOFF_BASE_MS * 2 ** attempt);
+      attempt += 1;
+      schedule(delay / 2 + Math.random() * delay / 2);
+    } finally {
+      running = false;
+    }
+  };
+
+  const onOnline = () => {
+    attempt = 0;
+    schedule(0);
+  };
+  window.addEventListener('online', onOnline);
+  schedule(0);
+
+  return {
+    syncNow: onOnline,
+    stop: () => {
+      stopped = true;
+      clearTimeout(timer);
+      window.removeEventListener('online', onOnline);
+    }
+  };
+};
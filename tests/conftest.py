@@ -0,0 +1,99 @@
+"""
+Shared fixtures: the API wired to an in-memory MongoDB (mongomock-motor)
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+COLLECTIONS = [
+    "users_collection", "sessions_collection", "revoked_sessions_collection", "surveys_collection",
+    "counters_collection", "stats_collection", "codes_collection",
+]
+CACHES = ["session_cache", "segment_cache", "segment_stamp_cache", "idempotency_cache", "survey_version_cache",
+          "analytics_response_cache", "stream_ticket_cache"]
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Fresh in-memory database behind every server collection, with empty caches"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+    from cache import MemoryCacheBackend
+    from session_tokens import RevocationList
+    from survey_codec import SurveyCodec
+
+    db = mongomock_motor.AsyncMongoMockClient()[server.DB_NAME]
+    for attribute in COLLECTIONS:
+        monkeypatch.setattr(server, attribute, db[getattr(server, attribute).name])
+    monkeypatch.setattr(server, "INDEXES", [
+        (db[collection.name], keys, options) for collection, keys, options in server.INDEXES
+    ])
+    monkeypatch.setattr(server, "survey_codec", SurveyCodec(server.codes_collection, server.CHOICE_FIELDS))
+    monkeypatch.setattr(server, "revocation_list", RevocationList(server.revoked_sessions_collection))
+    for attribute in CACHES:
+        cache = getattr(server, attribute)
+        monkeypatch.setattr(server, attribute, MemoryCacheBackend(maxsize=1000, ttl=cache.cache.ttl))
+    server.community_version_cache.clear()
+    server.dirty_villages.clear()
+    asyncio.run(server.migrate_indexes())
+    return db
+
+
+@pytest.fixture
+def api(mongo):
+    """TestClient running the app's lifespan against the in-memory database"""
+    import server
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(api):
+    """login(user_id, email=None) -> X-Session-ID headers of a new opaque session"""
+    import server
+
+    async def create(user_id, email):
+        await server.users_collection.insert_one({"id": user_id, "email": email, "name": user_id})
+        await server.sessions_collection.insert_one({
+            "session_token": f"token-{user_id}",
+            "user_id": user_id,
+            "expires_at": datetime.utcnow() + timedelta(days=1)
+        })
+
+    def login_as(user_id, email=None):
+        api.portal.call(create, user_id, email or f"{user_id}@example.org")
+        return {"X-Session-ID": f"token-{user_id}"}
+
+    return login_as
+
+
+@pytest.fixture
+def admin(login, monkeypatch):
+    """X-Session-ID headers of a session whose user is listed in ADMIN_EMAILS"""
+    import server
+
+    monkeypatch.setattr(server, "ADMIN_EMAILS", {"admin@example.org"})
+    return login("admin", "admin@example.org")
+
+
+@pytest.fixture
+def make_survey():
+    """make_survey(**answers) -> a valid SurveyResponse body (first option of every question)"""
+    import server
+
+    def build(**answers):
+        survey = {field: "text" for field in server.SurveyResponse.model_fields}
+        survey.update({field: next(iter(options)) for field, options in server.CHOICE_FIELDS.items()})
+        survey.update(village_name="Rampur", date="2024-05-01", respondent_age=35)
+        survey.update(answers)
+        return survey
+
+    return build
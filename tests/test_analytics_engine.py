@@ -0,0 +1,93 @@
+"""
+Tests for the vectorized analytics engine against the original Python loops
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import analytics_engine  # noqa: E402
+import server  # noqa: E402
+
+FIELDS = ["doctor_visits", "hand_washing", "clean_water_access"]
+ANSWERS = {
+    "doctor_visits": ["Monthly", "Yearly", "Never"],
+    "hand_washing": ["Always", "Sometimes", "Never", None],
+    "clean_water_access": ["Yes", "No"],
+}
+VILLAGES = ["Rampur", "Sonpur", "Kalyan"]
+
+
+def sample_surveys(count, seed=7):
+    rng = random.Random(seed)
+    surveys = []
+    for _ in range(count):
+        survey = {"village_name": rng.choice(VILLAGES)}
+        for field, answers in ANSWERS.items():
+            value = rng.choice(answers)
+            if value is not None:
+                survey[field] = value
+        surveys.append(survey)
+    return surveys
+
+
+def loop_distributions(surveys, fields):
+    """calculate_analytics' original per-field loop"""
+    total = len(surveys)
+    stats = {}
+    if total > 0:
+        for field in fields:
+            counts = {}
+            for survey in surveys:
+                value = survey.get(field, "Unknown")
+                counts[value] = counts.get(value, 0) + 1
+            stats[field] = {value: round((count / total) * 100, 1) for value, count in counts.items()}
+    return stats
+
+
+def test_distributions_match_the_loop_key_order_included():
+    surveys = sample_surveys(500)
+    frame = analytics_engine.surveys_frame(surveys, FIELDS)
+    vectorized = analytics_engine.field_distributions(frame, FIELDS)
+    assert json.dumps(vectorized) == json.dumps(loop_distributions(surveys, FIELDS))
+
+
+def test_crosstab_matches_nested_counts():
+    surveys = sample_surveys(300)
+    frame = analytics_engine.surveys_frame(surveys, FIELDS)
+    expected = {}
+    for survey in surveys:
+        row = expected.setdefault(survey["clean_water_access"], {})
+        column = survey.get("hand_washing", "Unknown")
+        row[column] = row.get(column, 0) + 1
+    assert analytics_engine.crosstab(frame, "clean_water_access", "hand_washing") == expected
+
+
+def test_village_rollups_match_the_loop_per_village():
+    surveys = sample_surveys(400)
+    frame = analytics_engine.surveys_frame(surveys, ["village_name", *FIELDS])
+    rollups = analytics_engine.village_rollups(frame, FIELDS)
+    for village in VILLAGES:
+        in_village = [survey for survey in surveys if survey["village_name"] == village]
+        assert rollups[village]["total_responses"] == len(in_village)
+        assert rollups[village]["community_stats"] == loop_distributions(in_village, FIELDS)
+
+
+def test_empty_cohort():
+    report = analytics_engine.cohort_report([], FIELDS, [("hand_washing", "clean_water_access")])
+    assert report["total_responses"] == 0
+    assert report["community_stats"] == {}
+    assert report["villages"] == {}
+
+
+def test_cohort_endpoint_caps_the_segment(api, admin, make_survey, login, monkeypatch):
+    for index in range(3):
+        api.post("/api/survey/submit", json=make_survey(village_name=VILLAGES[index]), headers=login(f"u{index}"))
+    monkeypatch.setattr(server, "COHORT_MAX_SURVEYS", 2)
+    assert api.get("/api/survey/analytics/cohort", headers=admin).status_code == 413
+    report = api.get("/api/survey/analytics/cohort?village_name=Rampur", headers=admin).json()
+    assert report["total_responses"] == 1
+    assert list(report["villages"]) == ["Rampur"]
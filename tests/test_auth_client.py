@@ -0,0 +1,117 @@
+"""
+Tests for the Emergent Auth client against a local stub server
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    """Replays the queued status codes, then answers 200 with a profile"""
+
+    statuses = []
+    calls = []
+
+    def do_GET(self):
+        StubAuthHandler.calls.append(self.headers.get("X-Session-ID"))
+        status = StubAuthHandler.statuses.pop(0) if StubAuthHandler.statuses else 200
+        body = json.dumps({"id": "user-1", "email": "student@example.com", "name": "Student"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_auth_url(monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubAuthHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    StubAuthHandler.statuses = []
+    StubAuthHandler.calls = []
+    monkeypatch.setattr(server, "EMERGENT_AUTH_URL", f"http://127.0.0.1:{httpd.server_port}/session-data")
+    monkeypatch.setattr(server, "EMERGENT_AUTH_BACKOFF", 0.01)
+    yield
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch(session_id):
+    async def run():
+        async with server.create_auth_http_client() as http_client:
+            return await server.fetch_auth_session_data(session_id, http_client)
+    return asyncio.run(run())
+
+
+def test_returns_profile_and_forwards_session_id(stub_auth_url):
+    response = fetch("abc")
+    assert response.status_code == 200
+    assert response.json()["email"] == "student@example.com"
+    assert StubAuthHandler.calls == ["abc"]
+
+
+def test_retries_server_errors(stub_auth_url):
+    StubAuthHandler.statuses = [503, 502]
+    response = fetch("abc")
+    assert response.status_code == 200
+    assert len(StubAuthHandler.calls) == 3
+
+
+def test_does_not_retry_client_errors(stub_auth_url):
+    StubAuthHandler.statuses = [401]
+    response = fetch("abc")
+    assert response.status_code == 401
+    assert len(StubAuthHandler.calls) == 1
+
+
+def test_gives_up_after_configured_retries(stub_auth_url, monkeypatch):
+    monkeypatch.setattr(server, "EMERGENT_AUTH_RETRIES", 1)
+    StubAuthHandler.statuses = [500, 500, 500]
+    response = fetch("abc")
+    assert response.status_code == 500
+    assert len(StubAuthHandler.calls) == 2
+
+
+def test_backoff_does_not_hold_a_request_slot(stub_auth_url, monkeypatch):
+    monkeypatch.setattr(server, "EMERGENT_AUTH_BACKOFF", 0.5)
+    StubAuthHandler.statuses = [503]
+    finished = []
+
+    async def run():
+        monkeypatch.setattr(server, "auth_request_slots", asyncio.Semaphore(1))
+        async with server.create_auth_http_client() as http_client:
+            async def login(session_id):
+                await server.fetch_auth_session_data(session_id, http_client)
+                finished.append(session_id)
+            retried = asyncio.create_task(login("retried"))
+            while not StubAuthHandler.calls:
+                await asyncio.sleep(0.01)
+            await login("waiting")
+            await retried
+
+    asyncio.run(run())
+    assert finished == ["waiting", "retried"]
+
+
+def test_profile_rejects_a_non_json_auth_response(api, monkeypatch):
+    async def html_page(session_id):
+        return httpx.Response(200, content=b"<html>maintenance</html>")
+
+    monkeypatch.setattr(server, "fetch_auth_session_data", html_page)
+    response = api.post("/api/auth/profile", headers={"X-Session-ID": "abc"})
+    assert response.status_code == 401
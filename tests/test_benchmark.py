@@ -0,0 +1,52 @@
+"""
+Tests for the in-process load benchmark harness
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import httpx
+
+import benchmark
+import server
+
+
+def test_percentile_interpolates():
+    samples = [10.0, 20.0, 30.0, 40.0]
+    assert benchmark.percentile(samples, 0) == 10.0
+    assert benchmark.percentile(samples, 50) == 25.0
+    assert benchmark.percentile(samples, 100) == 40.0
+    assert benchmark.percentile([], 95) == 0.0
+
+
+def test_scenarios_run_against_the_app(mongo, make_survey):
+    args = argparse.Namespace(requests=12, concurrency=3, seed=1)
+    submissions = [make_survey(hand_washing=answer) for answer in ("Always", "Never")]
+
+    async def scenario():
+        sessions = []
+        for index in range(3):
+            await server.sessions_collection.insert_one({
+                "session_token": f"bench-{index}", "user_id": f"bench-user-{index}",
+                "expires_at": datetime.utcnow() + timedelta(days=1)
+            })
+            await server.users_collection.insert_one({"id": f"bench-user-{index}", "email": f"{index}@bench", "name": "b"})
+            sessions.append(f"bench-{index}")
+        async with server.lifespan(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+                await benchmark.prime_surveys(http, sessions, submissions)
+                rng = random.Random(args.seed)
+                return [
+                    await benchmark.run_scenario(http, name, sessions, submissions, args, rng)
+                    for name in benchmark.SCENARIOS
+                ]
+
+    results = asyncio.run(scenario())
+    assert [result["scenario"] for result in results] == list(benchmark.SCENARIOS)
+    for result in results:
+        assert (result["requests"], result["errors"]) == (12, 0)
+        latency = result["latency_ms"]
+        assert latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
@@ -0,0 +1,60 @@
+"""
+Tests for the in-process TTL/LRU cache
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import cache  # noqa: E402
+from cache import TTLCache  # noqa: E402
+
+
+def test_evicts_least_recently_used():
+    lru = TTLCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = TTLCache(maxsize=10, ttl=60)
+    lru.set("session", "user", ttl=5)
+    now[0] += 4
+    assert lru.get("session") == "user"
+    now[0] += 2
+    assert lru.get("session") is None
+    assert len(lru) == 0
+
+
+def test_per_entry_ttl_cannot_exceed_default():
+    lru = TTLCache(maxsize=10, ttl=1)
+    lru.set("a", 1, ttl=3600)
+    assert lru._entries["a"][1] - cache.time.monotonic() <= 1
+    lru.set("b", 2, ttl=-5)
+    assert lru.get("b") is None
+
+
+def test_stats_count_hits_and_misses():
+    lru = TTLCache(maxsize=10, ttl=60)
+    lru.set("a", 1)
+    lru.get("a")
+    lru.get("a")
+    lru.get("missing")
+    stats = lru.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_cache_stats_are_admin_only(api, login, admin):
+    assert api.get("/api/cache/stats", headers={"X-Session-ID": "nope"}).status_code == 401
+    assert api.get("/api/cache/stats", headers=login("student")).status_code == 403
+    stats = api.get("/api/cache/stats", headers=admin).json()
+    assert stats["session_cache"]["hits"] >= 0
@@ -0,0 +1,109 @@
+"""
+Tests for the async cache backends (memory and Redis, against a fake Redis server)
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from cache import MemoryCacheBackend, RedisCacheBackend  # noqa: E402
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def redis_backends(count, namespace="test", ttl=60):
+    """Backends of `count` separate clients (as in separate workers) on one fake server"""
+    server = fakeredis.FakeServer()
+    return [RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), namespace, ttl=ttl) for _ in range(count)]
+
+
+def make_backend(kind):
+    return MemoryCacheBackend(maxsize=100, ttl=60) if kind == "memory" else redis_backends(1)[0]
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_backends_round_trip_values_and_tuple_keys(kind):
+    async def scenario():
+        backend = make_backend(kind)
+        key = (("age_min", 18), ("village_name", "Alpha"))
+        await backend.set(key, ({"water_source": {"Tap": 3}}, 3))
+        await backend.set("session", ("user", 1))
+        assert await backend.get(key) == ({"water_source": {"Tap": 3}}, 3)
+        assert (await backend.stats())["size"] == 2
+        await backend.delete("session")
+        assert await backend.get("session", "missing") == "missing"
+        stats = await backend.stats()
+        assert (stats["backend"], stats["hits"], stats["misses"], stats["size"]) == (kind, 1, 1, 1)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_backends_drop_non_positive_ttl(kind):
+    async def scenario():
+        backend = make_backend(kind)
+        await backend.set("a", 1)
+        await backend.set("a", 2, ttl=-1)
+        assert await backend.get("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_backend_is_shared_between_workers():
+    async def scenario():
+        first, second = redis_backends(2)
+        await first.set("token", {"id": "u1"})
+        assert await second.get("token") == {"id": "u1"}
+        await second.delete("token")
+        assert await first.get("token") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_backend_namespaces_are_isolated():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        sessions = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), "app:session")
+        segments = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), "app:segment")
+        await sessions.set("k", 1)
+        await segments.set("k", 2)
+        await segments.delete("k")
+        assert await sessions.get("k") == 1
+        assert (await segments.stats())["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_redis_backend_caps_ttl_at_default():
+    async def scenario():
+        backend = redis_backends(1, ttl=5)[0]
+        await backend.set("a", 1, ttl=3600)
+        assert 0 < await backend.client.pttl(backend._key("a")) <= 5000
+
+    asyncio.run(scenario())
+
+
+def test_redis_errors_fall_back_to_misses():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        server.connected = False
+        backend = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), "down")
+        await backend.set("a", 1)
+        assert await backend.get("a", "default") == "default"
+        assert (await backend.stats())["errors"] >= 2
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_pop_hands_a_value_out_once(kind):
+    async def scenario():
+        backend = make_backend(kind)
+        await backend.set("ticket", "u1")
+        return await backend.pop("ticket"), await backend.pop("ticket"), await backend.get("ticket")
+
+    assert asyncio.run(scenario()) == ("u1", None, None)
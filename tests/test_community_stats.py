@@ -0,0 +1,70 @@
+"""
+Tests for community_stats computed from the counter store and the aggregation pipeline
+"""
+
+import asyncio
+
+import server
+
+
+def baseline_community_stats(all_surveys):
+    """The original per-request loop of calculate_analytics"""
+    total_responses = len(all_surveys)
+    community_stats = {}
+    if total_responses > 0:
+        for field in server.ANALYTICS_FIELDS:
+            field_stats = {}
+            for survey in all_surveys:
+                value = survey.get(field, "Unknown")
+                field_stats[value] = field_stats.get(value, 0) + 1
+            for key in field_stats:
+                field_stats[key] = round((field_stats[key] / total_responses) * 100, 1)
+            community_stats[field] = field_stats
+    return community_stats
+
+
+def sample_surveys(make_survey):
+    surveys = []
+    for index in range(7):
+        survey = make_survey(id=f"s{index}", user_id=f"u{index}")
+        survey["hand_washing"] = ["Always", "Never", "Rarely"][index % 3]
+        if index % 4 == 0:
+            del survey["clean_water_access"]
+        surveys.append(survey)
+    return surveys
+
+
+def test_aggregated_stats_match_the_baseline_loop(mongo, make_survey):
+    surveys = sample_surveys(make_survey)
+
+    async def scenario():
+        await server.surveys_collection.insert_many([dict(survey) for survey in surveys])
+        return server.community_stats_from_counts(*await server.aggregate_survey_counts())
+
+    stats = asyncio.run(scenario())
+    assert stats == baseline_community_stats(surveys)
+    assert stats["hand_washing"]["Always"] == 42.9
+    assert stats["clean_water_access"]["Unknown"] == 28.6
+
+
+def test_counter_store_matches_the_baseline_loop(mongo, make_survey):
+    surveys = sample_surveys(make_survey)
+
+    async def scenario():
+        await server.update_survey_counters([(None, survey) for survey in surveys])
+        return server.community_stats_from_counts(*await server.load_survey_counters())
+
+    assert asyncio.run(scenario()) == baseline_community_stats(surveys)
+
+
+def test_null_and_missing_answers_count_alike_everywhere(mongo, make_survey):
+    missing, null = make_survey(id="a", user_id="a"), make_survey(id="b", user_id="b", hand_washing=None)
+    del missing["hand_washing"]
+
+    async def scenario():
+        await server.surveys_collection.insert_many([dict(missing), dict(null)])
+        await server.update_survey_counters([(None, missing), (None, null)])
+        return await server.load_survey_counters(), await server.aggregate_survey_counts()
+
+    (stored, _), (aggregated, _) = asyncio.run(scenario())
+    assert stored["hand_washing"] == aggregated["hand_washing"] == {"Unknown": 2}
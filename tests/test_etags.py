@@ -0,0 +1,52 @@
+"""
+Tests for ETag/If-None-Match revalidation of my-response and analytics
+"""
+
+import server
+
+
+def test_etag_matching():
+    etag = server.make_etag("survey", "v1")
+    assert server.etag_matches(etag, etag)
+    assert server.etag_matches(etag.removeprefix("W/"), etag)
+    assert server.etag_matches(f'"other", {etag}', etag)
+    assert server.etag_matches("*", etag)
+    assert not server.etag_matches(None, etag)
+    assert not server.etag_matches(server.make_etag("survey", "v2"), etag)
+
+
+def test_my_response_revalidates_until_the_survey_changes(api, login, make_survey):
+    headers = login("u1")
+    api.post("/api/survey/submit", json=make_survey(), headers=headers)
+
+    first = api.get("/api/survey/my-response", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert api.get("/api/survey/my-response", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    api.patch("/api/survey/my-response", json={"hand_washing": "Never"}, headers=headers)
+    changed = api.get("/api/survey/my-response", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["survey"]["hand_washing"] == "Never"
+
+
+def test_analytics_revalidates_until_the_community_changes(api, login, make_survey):
+    headers = login("u1")
+    api.post("/api/survey/submit", json=make_survey(), headers=headers)
+
+    first = api.get("/api/survey/analytics", headers=headers)
+    etag = first.headers["ETag"]
+    not_modified = api.get("/api/survey/analytics", headers={**headers, "If-None-Match": etag})
+    assert (not_modified.status_code, not_modified.content) == (304, b"")
+    # Served again from the response cache, byte for byte
+    assert api.get("/api/survey/analytics", headers=headers).content == first.content
+
+    segment = api.get("/api/survey/analytics?village_name=Rampur", headers={**headers, "If-None-Match": etag})
+    assert segment.status_code == 200
+    assert segment.headers["ETag"] != etag
+
+    api.post("/api/survey/submit", json=make_survey(hand_washing="Never"), headers=login("u2"))
+    changed = api.get("/api/survey/analytics", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["community_stats"]["hand_washing"]["Never"] == 50.0
@@ -0,0 +1,56 @@
+"""
+Tests for the synthetic survey generator
+"""
+
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import generate_surveys  # noqa: E402
+import server  # noqa: E402
+
+
+def make_generator(distributions=None):
+    return generate_surveys.SurveyGenerator(
+        distributions or generate_surveys.load_distributions(None),
+        generate_surveys.village_names(5),
+        date(2024, 3, 1),
+        date(2024, 3, 31),
+    )
+
+
+def test_records_are_valid_survey_responses():
+    for survey in make_generator().chunk(seed=1, chunk_index=0, size=200):
+        assert set(survey) == set(server.SurveyResponse.model_fields)
+        server.SurveyResponse(**survey)
+        assert "2024-03-01" <= survey["date"] <= "2024-03-31"
+
+
+def test_choice_fields_cover_suggestion_rule_values():
+    with open(server.SUGGESTION_RULES_PATH) as f:
+        rules = json.load(f)["rules"]
+    for rule in rules:
+        assert set(rule["values"]) <= set(generate_surveys.CHOICE_FIELDS[rule["field"]])
+
+
+def test_chunks_are_reproducible_per_seed():
+    generator = make_generator()
+    assert generator.chunk(7, 3, 50) == generator.chunk(7, 3, 50)
+    assert generator.chunk(7, 3, 50) != generator.chunk(7, 4, 50)
+
+
+def test_distribution_overrides(tmp_path):
+    weights = tmp_path / "weights.json"
+    weights.write_text(json.dumps({"toilet_facility": {
+        "Private toilet with proper sanitation": 0, "Shared toilet in the neighborhood": 0, "Other": 0,
+    }}))
+    surveys = make_generator(generate_surveys.load_distributions(str(weights))).chunk(1, 0, 100)
+    assert {survey["toilet_facility"] for survey in surveys} == {"Open defecation"}
+
+
+def test_content_hash_matches_server():
+    survey = make_generator().chunk(1, 0, 1)[0]
+    assert generate_surveys.content_hash(survey) == server.survey_content_hash(survey)
@@ -0,0 +1,49 @@
+"""
+Tests for the index migration and the startup index check
+"""
+
+import asyncio
+import logging
+
+from fastapi.testclient import TestClient
+
+import server
+
+
+def drift_survey_date_index():
+    async def drift():
+        await server.surveys_collection.drop_index("date")
+        await server.surveys_collection.create_index([("date", -1)], name="date")
+    asyncio.run(drift())
+
+
+def test_migration_creates_every_declared_index(mongo):
+    assert asyncio.run(server.verify_indexes()) == []
+
+
+def test_startup_reports_drifted_indexes_without_rebuilding(mongo, caplog):
+    drift_survey_date_index()
+    with caplog.at_level(logging.ERROR, logger=server.logger.name):
+        with TestClient(server.app):
+            pass
+    assert "surveys.date" in caplog.text
+    assert asyncio.run(server.verify_indexes()) == ["surveys.date"]
+
+
+def test_migration_rebuilds_drifted_indexes(mongo):
+    drift_survey_date_index()
+    assert asyncio.run(server.migrate_indexes()) == []
+    info = asyncio.run(server.surveys_collection.index_information())
+    assert info["date"]["key"] == [("date", 1)]
+
+
+def test_explain_lists_every_branch_of_an_or_plan():
+    import explain_queries
+
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "SORT_MERGE", "inputStages": [
+        {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "submitted_at_id"}},
+        {"stage": "COLLSCAN"}
+    ]}}
+    assert explain_queries.plan_stages(plan) == [
+        "LIMIT", "SORT_MERGE", "FETCH", "IXSCAN(submitted_at_id)", "COLLSCAN"
+    ]
@@ -0,0 +1,158 @@
+"""
+Tests for the live community stats hub, using an in-memory stand-in for the
+replica-set change stream on the survey counter store
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from live_stats import LiveStatsHub, TooManySubscribers  # noqa: E402
+
+
+def render(field_counts, total):
+    return {
+        field: {value: round(count / total * 100, 1) for value, count in counts.items()}
+        for field, counts in field_counts.items()
+    } if total else {}
+
+
+def make_hub(**kwargs):
+    hub = LiveStatsHub(render=render, coalesce_interval=0.01, **kwargs)
+    hub.reset({"hand_washing": {"Always": 1}}, 1)
+    return hub
+
+
+async def fake_change_stream(events):
+    """Stands in for counters_collection.watch(full_document="updateLookup")"""
+    for event in events:
+        await asyncio.sleep(0)
+        yield event
+
+
+def counter_event(operation, counter_id, count=None):
+    event = {"operationType": operation, "documentKey": {"_id": counter_id}}
+    if count is not None:
+        event["fullDocument"] = {"_id": counter_id, "count": count}
+    return event
+
+
+def test_apply_deltas_updates_snapshot():
+    hub = make_hub()
+    hub.apply_deltas({("hand_washing", "Always"): -1, ("hand_washing", "Never"): 2}, 1)
+    payload = json.loads(hub.payload())
+    assert payload["total_responses"] == 2
+    assert payload["community_stats"] == {"hand_washing": {"Never": 100.0}}
+
+
+def test_change_stream_events_set_absolute_counts():
+    hub = make_hub()
+    events = [
+        counter_event("update", {"field": "hand_washing", "value": "Rarely"}, 3),
+        counter_event("update", "_total", 4),
+        # Replayed event after a resume must not double count
+        counter_event("update", {"field": "hand_washing", "value": "Rarely"}, 3),
+        counter_event("delete", {"field": "hand_washing", "value": "Always"}),
+        counter_event("update", "_version", None),
+    ]
+    asyncio.run(hub.consume_change_stream(fake_change_stream(events)))
+    assert hub.field_counts == {"hand_washing": {"Rarely": 3}}
+    assert hub.total_responses == 4
+
+
+def test_updates_are_coalesced_and_slow_subscribers_keep_only_latest():
+    async def scenario():
+        hub = make_hub()
+        runner = asyncio.create_task(hub.run())
+        slow = hub.reserve()
+        initial = json.loads(slow.get_nowait())
+        for _ in range(5):
+            hub.apply_deltas({("hand_washing", "Never"): 1}, 1)
+        await asyncio.sleep(0.05)
+        for _ in range(5):
+            hub.apply_deltas({("hand_washing", "Rarely"): 1}, 1)
+        await asyncio.sleep(0.05)
+        latest = json.loads(slow.get_nowait())
+        assert slow.empty()
+        hub.release(slow)
+        runner.cancel()
+        return hub, initial, latest
+
+    hub, initial, latest = asyncio.run(scenario())
+    assert initial["total_responses"] == 1
+    assert latest["total_responses"] == 11
+    assert hub.broadcasts == 2
+    assert hub.dropped == 1
+    assert hub.stats()["subscribers"] == 0
+
+
+def test_subscriber_limit():
+    async def scenario():
+        hub = make_hub(max_subscribers=1)
+        queue = hub.reserve()
+        assert not hub.has_capacity()
+        try:
+            hub.reserve()
+        except TooManySubscribers:
+            return True
+        finally:
+            hub.release(queue)
+        return False
+
+    assert asyncio.run(scenario())
+
+
+def test_counter_watch_snapshots_after_the_stream_opens(monkeypatch):
+    import server
+
+    order = []
+
+    class Stream:
+        async def __aenter__(self):
+            order.append("open")
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            raise asyncio.CancelledError
+
+    class Counters:
+        def watch(self, **kwargs):
+            return Stream()
+
+    async def snapshot():
+        order.append("snapshot")
+        return {}, 0
+
+    monkeypatch.setattr(server, "counters_collection", Counters())
+    monkeypatch.setattr(server, "load_survey_counters", snapshot)
+    try:
+        asyncio.run(server.watch_survey_counters())
+    except asyncio.CancelledError:
+        pass
+    assert order == ["open", "snapshot"]
+
+
+def test_reserved_slots_count_against_the_limit_until_released():
+    async def scenario():
+        hub = make_hub(max_subscribers=1)
+        queue = hub.reserve()
+        try:
+            hub.reserve()
+        except TooManySubscribers:
+            rejected = True
+        else:
+            rejected = False
+        hub.release(queue)
+        hub.release(queue)
+        return rejected, hub.has_capacity(), json.loads(queue.get_nowait())["total_responses"]
+
+    assert asyncio.run(scenario()) == (True, True, 1)
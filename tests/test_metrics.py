@@ -0,0 +1,57 @@
+"""
+Tests for the Prometheus-style metrics module
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import metrics  # noqa: E402
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, ("/api/",))
+    lines = list(histogram.render())
+    assert 'demo_seconds_bucket{route="/api/",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/api/",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/api/",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/api/"} 4' in lines
+    assert 'demo_seconds_sum{route="/api/"} 3.65' in lines
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("demo_total", "Demo", ("route",))
+    counter.inc(('/a"b\\',))
+    assert 'demo_total{route="/a\\"b\\\\"} 1.0' in list(counter.render())
+
+
+def test_command_listener_attributes_ops_to_request_across_executor():
+    """Motor runs driver calls in an executor with a copy of the caller's context"""
+    from motor.frameworks import asyncio as motor_asyncio
+
+    event = SimpleNamespace(command_name="find", duration_micros=2500)
+
+    async def request():
+        stats = metrics.RequestStats()
+        metrics.current_request_stats.set(stats)
+        loop = asyncio.get_running_loop()
+        await motor_asyncio.run_on_executor(loop, metrics.command_listener.succeeded, event)
+        await motor_asyncio.run_on_executor(loop, metrics.command_listener.failed, event)
+        return stats
+
+    stats = asyncio.run(request())
+    assert stats.db_ops == 2
+    assert abs(stats.db_seconds - 0.005) < 1e-9
+    rendered = metrics.render()
+    assert 'mongodb_command_duration_seconds_count{command="find",outcome="success"}' in rendered
+
+
+def test_render_includes_extra_gauges():
+    rendered = metrics.render([("cache_hits", "Hits", {(("cache", "session"),): 7})])
+    assert "# TYPE cache_hits gauge" in rendered
+    assert 'cache_hits{cache="session"} 7' in rendered
@@ -0,0 +1,83 @@
+"""
+Tests for read_json_body and iter_body_lines (compressed sync and bulk bodies)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import zlib
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+
+
+class FakeRequest:
+    def __init__(self, body, encoding=None, chunk_size=7):
+        self.headers = {"content-encoding": encoding} if encoding else {}
+        self.chunks = [body[start:start + chunk_size] for start in range(0, len(body), chunk_size)]
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def read(body, encoding=None, max_bytes=1024):
+    return asyncio.run(server.read_json_body(FakeRequest(body, encoding), max_bytes))
+
+
+def status_of(body, encoding=None, max_bytes=1024):
+    with pytest.raises(HTTPException) as exc:
+        read(body, encoding, max_bytes)
+    return exc.value.status_code
+
+
+def test_plain_gzip_and_deflate_bodies():
+    payload = {"submissions": [{"client_id": "a", "survey": {"village_name": "X"}}]}
+    raw = json.dumps(payload).encode()
+    assert read(raw) == payload
+    assert read(gzip.compress(raw), "gzip") == payload
+    assert read(zlib.compress(raw), "deflate") == payload
+
+
+def test_decoded_size_is_capped():
+    # A tiny gzip body that would inflate far past the limit
+    assert status_of(gzip.compress(b" " * 100_000), "gzip", max_bytes=1024) == 413
+    assert status_of(b"[" + b"1," * 1000 + b"1]", max_bytes=1024) == 413
+
+
+def test_malformed_bodies():
+    raw = gzip.compress(b'{"submissions": []}')
+    assert status_of(raw[:-8], "gzip") == 400
+    assert status_of(b"not gzip", "gzip") == 400
+    assert status_of(b"{not json") == 400
+    assert status_of(b"{}", "br") == 415
+
+
+def lines_of(body, encoding=None, max_line_bytes=64, chunk_size=7):
+    async def collect():
+        request = FakeRequest(body, encoding, chunk_size)
+        return [line async for line in server.iter_body_lines(request, max_line_bytes)]
+    return asyncio.run(collect())
+
+
+def test_ndjson_lines_from_plain_and_compressed_bodies():
+    raw = b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'
+    expected = [b'{"a": 1}', b"", b'{"b": 2}', b'{"c": 3}']
+    assert lines_of(raw) == expected
+    assert lines_of(gzip.compress(raw), "gzip") == expected
+    assert lines_of(zlib.compress(raw), "deflate", chunk_size=1000) == expected
+
+
+def test_ndjson_line_length_is_capped():
+    with pytest.raises(HTTPException) as exc:
+        lines_of(b"x" * 1000, max_line_bytes=64)
+    assert exc.value.status_code == 413
+    with pytest.raises(HTTPException) as exc:
+        lines_of(gzip.compress(b"ok\n" + b"x" * 100_000), "gzip", max_line_bytes=64, chunk_size=1000)
+    assert exc.value.status_code == 413
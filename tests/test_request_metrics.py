@@ -0,0 +1,55 @@
+"""
+Tests for per-request metrics and access to /api/metrics
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import metrics
+import server
+
+
+def test_streamed_response_is_timed_to_its_last_chunk():
+    async def rows():
+        for index in range(3):
+            await asyncio.sleep(0.05)
+            # Cursor reads happen while the body streams, after the headers went out
+            metrics.current_request_stats.get().db_ops += 1
+            yield b"row %d\n" % index
+
+    app = FastAPI()
+
+    @app.get("/stream-test")
+    async def export():
+        return StreamingResponse(rows(), media_type="text/plain")
+
+    app.add_middleware(server.RequestMetricsMiddleware)
+    with TestClient(app) as client:
+        assert client.get("/stream-test").text == "row 0\nrow 1\nrow 2\n"
+
+    series = metrics.http_request_duration._series[("GET", "/stream-test", "200")]
+    assert series[-1] >= 0.15
+    assert metrics.http_request_db_ops._values[("/stream-test",)] == 3
+
+
+def test_metrics_require_a_session(api):
+    assert api.get("/api/metrics").status_code == 401
+
+
+def test_metrics_are_hidden_from_non_admins(api, login):
+    assert api.get("/api/metrics", headers=login("collector")).status_code == 403
+
+
+def test_metrics_are_readable_by_admins(api, admin):
+    response = api.get("/api/metrics", headers=admin)
+    assert response.status_code == 200
+    assert 'cache_hits{cache="session"}' in response.text
+
+
+def test_metrics_accept_the_scrape_token(api, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape-secret")
+    assert api.get("/api/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    assert api.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
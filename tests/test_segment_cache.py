@@ -0,0 +1,55 @@
+"""
+Tests for the per-segment analytics counts cache and its village stamps
+"""
+
+import asyncio
+
+import server
+
+
+def test_write_in_a_village_retires_only_its_segments(mongo, make_survey):
+    async def scenario():
+        rampur, sonpur = {"village_name": "Rampur"}, {"village_name": "Sonpur"}
+        await server.load_segment_counts(rampur)
+        await server.load_segment_counts(sonpur)
+        survey = make_survey(id="a", hand_washing="Never")
+        await server.surveys_collection.insert_one(survey)
+        await server.invalidate_segments([(None, survey)])
+        return (
+            await server.load_segment_counts(rampur),
+            await server.segment_cache.get(tuple(sorted(sonpur.items()))),
+            await server.segment_stamp_cache.get(server.segment_stamp_key("Sonpur")),
+        )
+
+    (field_counts, total), sonpur_entry, sonpur_stamp = asyncio.run(scenario())
+    assert total == 1
+    assert field_counts["hand_washing"] == {"Never": 1}
+    assert sonpur_entry[0] == sonpur_stamp
+
+
+def test_count_started_before_a_write_is_not_served_after_it(mongo, make_survey, monkeypatch):
+    aggregate = server.aggregate_survey_counts
+
+    async def scenario():
+        survey = make_survey(id="a")
+
+        async def write_during_count(match=None):
+            counts = await aggregate(match)
+            await server.surveys_collection.insert_one(survey)
+            await server.invalidate_segments([(None, survey)])
+            return counts
+
+        monkeypatch.setattr(server, "aggregate_survey_counts", write_during_count)
+        stale = await server.load_segment_counts({"village_name": "Rampur"})
+        monkeypatch.setattr(server, "aggregate_survey_counts", aggregate)
+        return stale, await server.load_segment_counts({"village_name": "Rampur"})
+
+    (_, stale_total), (_, total) = asyncio.run(scenario())
+    assert stale_total == 0
+    assert total == 1
+
+
+def test_segment_dates_are_validated(api, login):
+    headers = login("u1")
+    assert api.get("/api/survey/suggestions/report?date_from=May 1", headers=headers).status_code == 422
+    assert api.get("/api/survey/suggestions/report?date_to=2024-5-1", headers=headers).status_code == 200
@@ -0,0 +1,51 @@
+"""
+Tests for orjson rendering and raw-body survey validation
+"""
+
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import server
+
+
+def default_render(payload):
+    """FastAPI's default path: jsonable_encoder, then JSONResponse"""
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def test_render_json_matches_the_default_encoder_byte_for_byte():
+    payload = {
+        "survey": {
+            "village_name": "Rāmpur – ঘাট",
+            "respondent_age": 35,
+            "submitted_at": datetime(2024, 5, 1, 10, 30, 15, 123000),
+            "score": 42.9,
+            "tags": ["a", None, True],
+        },
+        "changed_fields": [],
+    }
+    assert server.render_json(payload) == default_render(payload)
+
+
+def test_my_response_body_matches_the_default_encoder(api, login, make_survey):
+    headers = login("u1")
+    api.post("/api/survey/submit", json=make_survey(student_name="Zoë"), headers=headers)
+    stored = api.portal.call(server.surveys_collection.find_one, {"user_id": "u1"}, {"_id": 0})
+    response = api.get("/api/survey/my-response", headers=headers)
+    assert response.content == default_render({"survey": stored})
+    server.MySurveyResult.model_validate(response.json())
+
+
+def test_invalid_bodies_report_field_locations(api, login, make_survey):
+    headers = login("u1")
+    survey = make_survey()
+    del survey["village_name"]
+    response = api.post("/api/survey/submit", json={**survey, "respondent_age": "old"}, headers=headers)
+    assert response.status_code == 422
+    locations = {tuple(error["loc"]) for error in response.json()["detail"]}
+    assert locations == {("body", "village_name"), ("body", "respondent_age")}
+
+    garbled = api.post("/api/survey/submit", content=b"{not json", headers={**headers, "Content-Type": "application/json"})
+    assert garbled.status_code == 422
@@ -0,0 +1,93 @@
+"""
+Tests for signed session tokens and the revocation list
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import session_tokens  # noqa: E402
+from session_tokens import RevocationList  # noqa: E402
+
+SECRET = "test-secret"
+USER = {"id": "u1", "email": "a@example.org", "name": "A", "picture": None}
+
+
+class RevokedSessions:
+    """Just enough of a Motor collection for the revocation list: find by revoked_at, upsert by _id"""
+
+    def __init__(self):
+        self.entries = {}
+        self.finds = 0
+
+    async def _iterate(self, since):
+        for entry in list(self.entries.values()):
+            if since is None or entry["revoked_at"] >= since:
+                yield dict(entry)
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return self._iterate(query.get("revoked_at", {}).get("$gte"))
+
+    async def update_one(self, query, update, upsert=False):
+        self.entries.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+
+def test_token_round_trip():
+    token = session_tokens.issue_token(USER, SECRET, timedelta(hours=1))
+    assert session_tokens.looks_like_jwt(token)
+    claims = session_tokens.decode_token(token, SECRET)
+    assert session_tokens.user_from_claims(claims) == USER
+    assert claims["jti"] != session_tokens.decode_token(session_tokens.issue_token(USER, SECRET, timedelta(hours=1)), SECRET)["jti"]
+
+
+def test_rejects_expired_and_forged_tokens():
+    expired = session_tokens.issue_token(USER, SECRET, timedelta(seconds=-1))
+    with pytest.raises(jwt.ExpiredSignatureError):
+        session_tokens.decode_token(expired, SECRET)
+    forged = session_tokens.issue_token(USER, "other-secret", timedelta(hours=1))
+    with pytest.raises(jwt.InvalidTokenError):
+        session_tokens.decode_token(forged, SECRET)
+
+
+def test_opaque_tokens_are_not_mistaken_for_jwts():
+    assert not session_tokens.looks_like_jwt("6f1c7a8e-0b1d-4a44-9c1e-2f7d9b3e5a10")
+
+
+def test_revocation_is_seen_by_other_workers_after_refresh(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(session_tokens.time, "monotonic", lambda: now[0])
+
+    async def scenario():
+        collection = RevokedSessions()
+        first, second = RevocationList(collection, 10), RevocationList(collection, 10)
+        assert not await second.is_revoked("jti-1")
+        await first.revoke("jti-1", datetime.utcnow() + timedelta(hours=1))
+        assert await first.is_revoked("jti-1")
+        # Cached until the next refresh...
+        assert not await second.is_revoked("jti-1")
+        now[0] += 11
+        assert await second.is_revoked("jti-1")
+        # One initial load per worker, then a single refresh
+        assert collection.finds == 3
+
+    asyncio.run(scenario())
+
+
+def test_expired_revocations_are_dropped():
+    async def scenario():
+        collection = RevokedSessions()
+        revocations = RevocationList(collection, 10)
+        await revocations.revoke("old", datetime.utcnow() - timedelta(seconds=1))
+        await revocations.revoke("live", datetime.utcnow() + timedelta(hours=1))
+        await revocations.load()
+        assert revocations.stats()["revoked"] == 1
+        assert await revocations.is_revoked("live")
+
+    asyncio.run(scenario())
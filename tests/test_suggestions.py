@@ -0,0 +1,76 @@
+"""
+Tests for the compiled suggestion rule table
+"""
+
+import asyncio
+import itertools
+import json
+
+import orjson
+import pytest
+
+import server
+
+# The original generate_suggestions if-chain: (field, triggering answers, title), in order
+IF_CHAIN = [
+    ("medicines_available", ["No"], "Medicine Availability"),
+    ("healthcare_affordability", ["No"], "Affordable Healthcare"),
+    ("clean_water_access", ["No, we rely on alternative sources", "No, access is very limited"], "Clean Water Access"),
+    ("toilet_facility", ["Open defecation"], "Toilet Facility"),
+    ("hand_washing", ["Rarely", "Never"], "Hand Washing"),
+    ("community_waste_system", ["No"], "Community Waste System"),
+]
+FALLBACK_TITLE = "Maintain Good Practices"
+
+
+def if_chain_titles(survey):
+    titles = [title for field, values, title in IF_CHAIN if survey.get(field) in values]
+    return titles or [FALLBACK_TITLE]
+
+
+def every_trigger_combination():
+    options = [[None, *values] for _, values, _ in IF_CHAIN]
+    for answers in itertools.product(*options):
+        yield {field: answer for (field, _, _), answer in zip(IF_CHAIN, answers) if answer is not None}
+
+
+def test_rule_table_matches_the_if_chain():
+    for survey in every_trigger_combination():
+        assert [suggestion["title"] for suggestion in server.generate_suggestions(survey)] == if_chain_titles(survey)
+
+
+def test_suggestions_serialize_like_the_rule_file():
+    with open(server.SUGGESTION_RULES_PATH) as f:
+        table = json.load(f)
+    survey = {"medicines_available": "No", "hand_washing": "Never"}
+    rendered = orjson.loads(server.render_json(server.generate_suggestions(survey)))
+    assert rendered == [table["rules"][0]["suggestion"], table["rules"][4]["suggestion"]]
+    assert orjson.loads(server.render_json(server.generate_suggestions({}))) == [table["fallback"]]
+
+
+def test_suggestion_payloads_are_shared_and_read_only():
+    first = server.generate_suggestions({"toilet_facility": "Open defecation"})[0]
+    second = server.generate_suggestions({"toilet_facility": "Open defecation", "hand_washing": "Always"})[0]
+    assert first is second
+    with pytest.raises(TypeError):
+        first["title"] = "Changed"
+    assert isinstance(first["resources"], tuple)
+
+
+def test_report_counts_match_per_survey_evaluation(mongo, make_survey):
+    surveys = [
+        make_survey(id=f"s{index}", user_id=f"u{index}", **answers)
+        for index, answers in enumerate(itertools.islice(every_trigger_combination(), 0, None, 5))
+    ]
+
+    async def scenario():
+        await server.surveys_collection.insert_many([dict(survey) for survey in surveys])
+        return await server.suggestion_report()
+
+    report = asyncio.run(scenario())
+    expected = {}
+    for survey in surveys:
+        for title in if_chain_titles(survey):
+            expected[title] = expected.get(title, 0) + 1
+    assert report["total_responses"] == len(surveys)
+    assert {entry["title"]: entry["surveys"] for entry in report["suggestions"] if entry["surveys"]} == expected
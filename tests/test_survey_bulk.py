@@ -0,0 +1,43 @@
+"""
+Tests for bulk survey ingestion (NDJSON and JSON arrays)
+"""
+
+import gzip
+import json
+
+import server
+
+
+def test_ndjson_records_are_created_then_unchanged(api, login, make_survey):
+    headers = {**login("collector"), "Content-Type": "application/x-ndjson"}
+    body = "\n".join(json.dumps(make_survey(id=f"r{index}")) for index in range(3)) + "\n{not json}\n"
+
+    first = api.post("/api/survey/bulk", content=body, headers=headers).json()
+    assert first["summary"] == {"received": 4, "created": 3, "invalid": 1}
+    again = api.post("/api/survey/bulk", content=body, headers=headers).json()
+    assert again["summary"] == {"received": 4, "unchanged": 3, "invalid": 1}
+    assert [result["index"] for result in again["results"]] == [0, 1, 2, 3]
+
+
+def test_json_array_body_is_size_capped(api, login, make_survey, monkeypatch):
+    monkeypatch.setattr(server, "SURVEY_BULK_MAX_BYTES", 1024)
+    body = json.dumps([make_survey(id=f"r{index}") for index in range(5)])
+    response = api.post("/api/survey/bulk", content=body, headers={**login("collector"), "Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_results_are_truncated_but_fully_counted(api, login, make_survey, monkeypatch):
+    monkeypatch.setattr(server, "SURVEY_BULK_MAX_RESULTS", 2)
+    body = json.dumps([make_survey(id=f"r{index}") for index in range(5)])
+    response = api.post("/api/survey/bulk", content=body, headers={**login("collector"), "Content-Type": "application/json"})
+    result = response.json()
+    assert result["summary"] == {"received": 5, "created": 5}
+    assert len(result["results"]) == 2
+    assert result["results_truncated"] is True
+
+
+def test_gzip_ndjson_is_inflated(api, login, make_survey):
+    body = gzip.compress("\n".join(json.dumps(make_survey(id=f"r{index}")) for index in range(3)).encode())
+    headers = {**login("collector"), "Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+    response = api.post("/api/survey/bulk", content=body, headers=headers)
+    assert response.json()["summary"] == {"received": 3, "created": 3}
@@ -0,0 +1,88 @@
+"""
+Tests for SurveyCodec (dictionary-encoded survey answers)
+"""
+
+import asyncio
+import os
+import sys
+
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from survey_codec import SurveyCodec  # noqa: E402
+
+CHOICES = {
+    "hand_washing": ["Always", "Sometimes", "Rarely", "Never"],
+    "toilet_facility": ["Private toilet with proper sanitation", "Open defecation", "Other"],
+}
+
+
+class CodeTable:
+    """Just enough of a Motor collection for the code table: find, and insert_one with its unique keys"""
+
+    def __init__(self):
+        self.entries = []
+
+    async def _iterate(self):
+        for entry in list(self.entries):
+            yield dict(entry)
+
+    def find(self, query):
+        return self._iterate()
+
+    async def insert_one(self, entry):
+        for existing in self.entries:
+            if existing["_id"] == entry["_id"] or (existing["field"], existing["code"]) == (entry["field"], entry["code"]):
+                raise DuplicateKeyError("duplicate key")
+        self.entries.append(dict(entry))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_round_trip_leaves_free_text_alone():
+    codec = SurveyCodec(CodeTable(), CHOICES)
+    survey = {"village_name": "Rampur", "hand_washing": "Rarely", "toilet_facility": "Open defecation"}
+    encoded = run(codec.encode(survey))
+    assert encoded == {"village_name": "Rampur", "hand_washing": 0, "toilet_facility": 0}
+    assert run(codec.decode(encoded)) == survey
+    assert run(codec.decode(survey)) == survey
+    assert run(codec.decode(None)) is None
+
+
+def test_workers_share_codes_through_the_table():
+    table = CodeTable()
+    first, second = SurveyCodec(table, CHOICES), SurveyCodec(table, CHOICES)
+    assert run(first.code_for("hand_washing", "Always")) == 0
+    # second has not loaded the table: its first pick collides and it adopts the shared code
+    assert run(second.code_for("hand_washing", "Never")) == 1
+    assert run(second.code_for("hand_washing", "Always")) == 0
+    # first meets a code it has never seen and reloads the table to decode it
+    assert run(first.decode({"hand_washing": 1})) == {"hand_washing": "Never"}
+
+
+def test_counts_merge_plain_and_encoded_keys():
+    codec = SurveyCodec(CodeTable(), CHOICES)
+    code = run(codec.code_for("hand_washing", "Never"))
+    assert run(codec.decode_counts("hand_washing", {code: 3, "Never": 2, "Always": 1})) == {"Never": 5, "Always": 1}
+    assert codec.match_values("hand_washing", {"Never", "Rarely"}) == ["Never", "Rarely", code]
+
+
+def test_categorical_fields_match_the_survey_form():
+    import generate_surveys
+    import server
+    assert server.CATEGORICAL_FIELDS == list(generate_surveys.CHOICE_FIELDS)
+    assert set(server.ANALYTICS_FIELDS) <= set(server.CATEGORICAL_FIELDS)
+
+
+def test_only_form_options_are_encoded():
+    table = CodeTable()
+    codec = SurveyCodec(table, CHOICES)
+    survey = {"hand_washing": "After every call of nature", "toilet_facility": "Other"}
+    encoded = run(codec.encode(survey))
+    assert encoded == {"hand_washing": "After every call of nature", "toilet_facility": 0}
+    assert run(codec.code_for("hand_washing", "x" * 1000)) is None
+    assert [entry["_id"] for entry in table.entries] == [{"field": "toilet_facility", "value": "Other"}]
+    assert run(codec.decode(encoded)) == survey
@@ -0,0 +1,74 @@
+"""
+Tests for the community counter store: incremental updates and rebuilds
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import server
+
+
+def recount():
+    return server.aggregate_survey_counts()
+
+
+def test_counters_match_a_recount_after_writes(api, login, make_survey):
+    first, second = login("u1"), login("u2")
+    api.post("/api/survey/submit", json=make_survey(hand_washing="Never"), headers=first)
+    api.post("/api/survey/submit", json=make_survey(hand_washing="Always"), headers=second)
+    api.post("/api/survey/submit", json=make_survey(hand_washing="Rarely"), headers=first)
+    api.patch("/api/survey/my-response", json={"clean_water_access": "No, access is very limited"}, headers=second)
+
+    stored, total = api.portal.call(server.load_survey_counters)
+    recounted, recounted_total = api.portal.call(recount)
+    assert (stored, total) == (recounted, recounted_total)
+    assert total == 2
+    assert stored["hand_washing"] == {"Always": 1, "Rarely": 1}
+
+
+def test_rebuild_overwrites_drifted_counters_and_bumps_the_version(mongo, make_survey):
+    async def scenario():
+        await server.surveys_collection.insert_many([
+            make_survey(id="a", hand_washing="Never"), make_survey(id="b", hand_washing="Never")
+        ])
+        await server.counters_collection.insert_many([
+            {"_id": {"field": "hand_washing", "value": "Never"}, "count": 7},
+            {"_id": {"field": "hand_washing", "value": "Gone"}, "count": 1},
+            {"_id": server.TOTAL_COUNTER_ID, "count": 9},
+            {"_id": server.VERSION_COUNTER_ID, "version": 4},
+        ])
+        assert await server.rebuild_survey_counters()
+        version = await server.counters_collection.find_one({"_id": server.VERSION_COUNTER_ID})
+        return await server.load_survey_counters(), version["version"]
+
+    (field_counts, total), version = asyncio.run(scenario())
+    assert total == 2
+    assert field_counts["hand_washing"] == {"Never": 2}
+    assert version == 5
+
+
+def test_concurrent_startups_rebuild_once(mongo, make_survey):
+    async def scenario():
+        await server.surveys_collection.insert_one(make_survey(id="a"))
+        await asyncio.gather(*(server.ensure_survey_counters() for _ in range(3)))
+        version = await server.counters_collection.find_one({"_id": server.VERSION_COUNTER_ID})
+        lock = await server.counters_collection.find_one({"_id": server.COUNTER_REBUILD_LOCK_ID})
+        return await server.load_survey_counters(), version["version"], lock
+
+    (_, total), version, lock = asyncio.run(scenario())
+    assert total == 1
+    assert version == 1
+    assert lock is None
+
+
+def test_rebuild_skips_while_locked_but_takes_over_an_expired_lock(mongo):
+    async def scenario():
+        lock = {"_id": server.COUNTER_REBUILD_LOCK_ID, "expires_at": datetime.utcnow() + timedelta(minutes=5)}
+        await server.counters_collection.insert_one(lock)
+        held = await server.rebuild_survey_counters()
+        await server.counters_collection.update_one(
+            {"_id": server.COUNTER_REBUILD_LOCK_ID}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        return held, await server.rebuild_survey_counters()
+
+    assert asyncio.run(scenario()) == (False, True)
@@ -0,0 +1,40 @@
+"""
+Tests for the streamed CSV/NDJSON survey export
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def surveys(api, login, make_survey):
+    api.post("/api/survey/submit", json=make_survey(respondent_name="=HYPERLINK(\"http://x\")"), headers=login("u1"))
+    api.post("/api/survey/submit", json=make_survey(respondent_name="Asha", additional_comments="-no comment"), headers=login("u2"))
+
+
+def test_csv_export_neutralizes_formulas(api, admin, surveys):
+    response = api.get("/api/survey/export", headers=admin)
+    assert response.status_code == 200
+    rows = {row["user_id"]: row for row in csv.DictReader(io.StringIO(response.text))}
+    assert list(rows) == ["u1", "u2"]
+    assert rows["u1"]["respondent_name"] == "'=HYPERLINK(\"http://x\")"
+    assert rows["u2"]["respondent_name"] == "Asha"
+    assert rows["u2"]["additional_comments"] == "'-no comment"
+
+
+def test_ndjson_export_keeps_values_verbatim(api, admin, surveys):
+    response = api.get("/api/survey/export?format=ndjson&gzip=true", headers=admin)
+    # The client undoes the Content-Encoding
+    assert response.headers["Content-Encoding"] == "gzip"
+    records = [json.loads(line) for line in response.content.splitlines()]
+    assert [record["respondent_name"] for record in records] == ["=HYPERLINK(\"http://x\")", "Asha"]
+    assert set(records[0]) <= set(server.EXPORT_FIELDS)
+
+
+def test_export_is_admin_only(api, login, surveys):
+    assert api.get("/api/survey/export", headers=login("u3")).status_code == 403
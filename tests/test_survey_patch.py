@@ -0,0 +1,44 @@
+"""
+Tests for field-level survey edits (PATCH /api/survey/my-response)
+"""
+
+import server
+
+
+def test_patch_sets_only_changed_fields_and_adjusts_counters(api, login, make_survey):
+    headers = login("u1")
+    api.post("/api/survey/submit", json=make_survey(hand_washing="Never"), headers=headers)
+
+    response = api.patch("/api/survey/my-response", json={"hand_washing": "Always", "village_name": "Rampur"}, headers=headers)
+    assert response.json()["changes"] == {"hand_washing": {"old": "Never", "new": "Always"}}
+    field_counts, total = api.portal.call(server.load_survey_counters)
+    assert field_counts["hand_washing"] == {"Always": 1}
+    assert total == 1
+
+    unchanged = api.patch("/api/survey/my-response", json={"hand_washing": "Always"}, headers=headers)
+    assert unchanged.json()["changes"] == {}
+
+
+def test_patch_validates_only_the_given_fields(api, login, make_survey):
+    headers = login("u1")
+    assert api.patch("/api/survey/my-response", json={"hand_washing": "Never"}, headers=headers).status_code == 404
+    api.post("/api/survey/submit", json=make_survey(), headers=headers)
+    assert api.patch("/api/survey/my-response", json={"respondent_age": "old"}, headers=headers).status_code == 422
+    assert api.patch("/api/survey/my-response", json={"hand_washing": None}, headers=headers).status_code == 422
+
+
+def test_concurrent_edit_is_a_conflict(api, login, make_survey, monkeypatch):
+    headers = login("u1")
+    api.post("/api/survey/submit", json=make_survey(), headers=headers)
+    decode = server.survey_codec.decode
+
+    async def decode_then_edit_elsewhere(survey):
+        decoded = await decode(survey)
+        await server.surveys_collection.update_one({"user_id": "u1"}, {"$set": {"content_hash": "other-edit"}})
+        return decoded
+
+    monkeypatch.setattr(server.survey_codec, "decode", decode_then_edit_elsewhere)
+    response = api.patch("/api/survey/my-response", json={"hand_washing": "Never"}, headers=headers)
+    assert response.status_code == 409
+    monkeypatch.setattr(server.survey_codec, "decode", decode)
+    assert api.get("/api/survey/my-response", headers=headers).json()["survey"]["hand_washing"] != "Never"
@@ -0,0 +1,32 @@
+"""
+Tests for the materialized survey_stats snapshots and their paged endpoint
+"""
+
+import server
+
+
+def test_village_snapshots_are_paged_by_name(api, login, make_survey):
+    for index, village in enumerate(["Sonpur", "Rampur", "Kalyan", "Rampur"]):
+        api.post("/api/survey/submit", json=make_survey(village_name=village), headers=login(f"u{index}"))
+    api.portal.call(server.refresh_survey_stats)
+    headers = login("reader")
+
+    first = api.get("/api/survey/analytics/villages?limit=2", headers=headers).json()
+    assert [village["village_name"] for village in first["villages"]] == ["Kalyan", "Rampur"]
+    assert first["has_more"] is True
+    assert first["global"]["total_responses"] == 4
+    assert first["villages"][1]["total_responses"] == 2
+
+    rest = api.get(f"/api/survey/analytics/villages?limit=2&cursor={first['next_cursor']}", headers=headers).json()
+    assert [village["village_name"] for village in rest["villages"]] == ["Sonpur"]
+    assert (rest["has_more"], rest["next_cursor"]) == (False, None)
+
+
+def test_village_snapshots_can_be_picked_by_name(api, login, make_survey):
+    api.post("/api/survey/submit", json=make_survey(village_name="Sonpur"), headers=login("u1"))
+    api.post("/api/survey/submit", json=make_survey(village_name="Rampur"), headers=login("u2"))
+    api.portal.call(server.refresh_survey_stats)
+
+    response = api.get("/api/survey/analytics/villages?village_name=Rampur&village_name=Nowhere", headers=login("u3"))
+    assert [village["village_name"] for village in response.json()["villages"]] == ["Rampur"]
+    assert api.get("/api/survey/analytics/villages?cursor=%%%", headers=login("u4")).status_code == 400
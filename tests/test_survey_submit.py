@@ -0,0 +1,60 @@
+"""
+Tests for survey submission: content-hash deduplication, idempotency keys and offline sync
+"""
+
+import server
+
+
+def version(api):
+    return api.portal.call(server.get_community_version)
+
+
+def test_identical_resubmission_is_not_rewritten(api, login, make_survey):
+    headers = login("u1")
+    first = api.post("/api/survey/submit", json=make_survey(), headers=headers).json()
+    assert first["changed_fields"] == list(server.SurveyResponse.model_fields)
+    before = version(api)
+
+    again = api.post("/api/survey/submit", json=make_survey(), headers=headers).json()
+    assert again == {**first, "changed_fields": []}
+    assert version(api) == before
+
+    edited = api.post("/api/survey/submit", json=make_survey(hand_washing="Never"), headers=headers).json()
+    assert edited["changed_fields"] == ["hand_washing"]
+    assert edited["survey_id"] != first["survey_id"]
+
+
+def test_idempotency_key_replays_the_recorded_response(api, login, make_survey):
+    headers = {**login("u1"), "Idempotency-Key": "attempt-1"}
+    first = api.post("/api/survey/submit", json=make_survey(), headers=headers)
+    retried = api.post("/api/survey/submit", json=make_survey(), headers=headers)
+    assert retried.status_code == 200
+    assert retried.content == first.content
+
+    reused = api.post("/api/survey/submit", json=make_survey(hand_washing="Never"), headers=headers)
+    assert reused.status_code == 409
+
+
+def test_idempotency_keys_are_per_user(api, login, make_survey):
+    first = api.post("/api/survey/submit", json=make_survey(), headers={**login("u1"), "Idempotency-Key": "k"})
+    other = api.post("/api/survey/submit", json=make_survey(hand_washing="Never"), headers={**login("u2"), "Idempotency-Key": "k"})
+    assert other.status_code == 200
+    assert other.json()["survey_id"] != first.json()["survey_id"]
+
+
+def test_sync_applies_the_newest_submission_and_acknowledges_retries(api, login, make_survey):
+    headers = login("u1")
+    batch = {"submissions": [
+        {"client_id": "a", "survey": make_survey(hand_washing="Never")},
+        {"client_id": "b", "survey": {"village_name": "Rampur"}},
+        {"client_id": "c", "survey": make_survey(hand_washing="Always")},
+    ]}
+    result = api.post("/api/survey/sync", json=batch, headers=headers).json()
+    assert [(ack["client_id"], ack["status"]) for ack in result["acknowledged"]] == [
+        ("a", "superseded"), ("b", "invalid"), ("c", "applied")
+    ]
+    stored = api.get("/api/survey/my-response", headers=headers).json()["survey"]
+    assert stored["hand_washing"] == "Always"
+
+    retried = api.post("/api/survey/sync", json=batch, headers=headers).json()
+    assert [ack["status"] for ack in retried["acknowledged"]] == ["duplicate", "invalid", "duplicate"]